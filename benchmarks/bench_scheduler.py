@@ -0,0 +1,177 @@
+"""
+Scheduler benchmarks
+
+    python -m pytest benchmarks/bench_scheduler.py --benchmark-autosave
+    python -m pytest benchmarks/bench_scheduler.py --benchmark-compare \
+        --benchmark-compare-fail=mean:20% --memory-baseline=.benchmarks/<machine>/0001_<commit>.json
+"""
+
+import datetime
+import io
+import json
+import pytest
+import pytz
+import subprocess
+import sys
+
+pytest.importorskip('pytest_benchmark')
+
+from scheduler import Scheduler, ScheduleQueue  # noqa: E402
+from scheduler.cli import run  # noqa: E402
+from scheduler.cronset import CronSet  # noqa: E402
+from scheduler.cursor import ScheduleCursor, move_all  # noqa: E402
+from scheduler.store import ScheduleStore  # noqa: E402
+
+FROM_DATE = datetime.datetime(2030, 1, 1, tzinfo=pytz.UTC)
+
+CRONS = {
+    'dense': '* * * * *',
+    'business': '0 9 * * 1-5',
+    'monthly': '0 0 1 * *',
+    'leap_day': '0 0 29 2 *',
+}
+
+DST = {
+    # just before the spring forward gap / fall back repeat
+    'new_york_gap': ('America/New_York', '30 2 * * *', datetime.datetime(2030, 3, 10, 6, 0, tzinfo=pytz.UTC)),
+    'new_york_repeat': ('America/New_York', '30 1 * * *', datetime.datetime(2030, 11, 3, 5, 0, tzinfo=pytz.UTC)),
+    'lord_howe': ('Australia/Lord_Howe', '15 2 * * *', datetime.datetime(2030, 10, 5, 14, 0, tzinfo=pytz.UTC)),
+}
+
+
+# recurring rules whose periods don't all hold the same days, folded with `count`
+RECURRING = {
+    'daily_weekdays': {'frequency': 'daily', 'by_weekday': ['MO', 'WE']},
+    'monthly_monthdays': {'frequency': 'monthly', 'by_monthday': [1, 15, -1]},
+    'monthly_31st': {'frequency': 'monthly', 'start_date': '01/31/2030'},
+    'yearly_leap_day': {'frequency': 'yearly', 'start_date': '02/29/2028'},
+}
+
+
+def date_specific(count):
+    start = datetime.datetime(2030, 1, 1)
+    return {
+        'schedule_type': 'date_specific',
+        'timezone': 'Asia/Calcutta',
+        'schedules': [
+            {
+                'start_date': (start + datetime.timedelta(hours=7 * index)).strftime('%m/%d/%Y'),
+                'start_time': (start + datetime.timedelta(hours=7 * index)).strftime('%I:%M %p'),
+            }
+            for index in range(count)
+        ]
+    }
+
+
+def cron(expression, timezone='Asia/Calcutta'):
+    return {'schedule_type': 'cron', 'timezone': timezone, 'cron': expression}
+
+
+def bulk_payloads(count):
+    return [cron('{} {} * * *'.format(index % 60, index % 24), ('UTC', 'Asia/Calcutta', 'America/New_York')[index % 3])
+            for index in range(count)]
+
+
+@pytest.mark.parametrize('count', [10, 1000, 100000])
+def test_date_specific_payload(measure, count):
+    payload = date_specific(count)
+    measure(Scheduler().get_next_eta, schedule_data=payload, from_date=FROM_DATE)
+
+
+@pytest.mark.parametrize('count', [10, 1000, 100000])
+def test_date_specific_compiled(measure, count):
+    compiled = Scheduler().compile(schedule_data=date_specific(count))
+    measure(compiled.next_eta, from_date=FROM_DATE)
+
+
+@pytest.mark.parametrize('sparsity', sorted(CRONS))
+def test_cron_payload(measure, sparsity):
+    measure(Scheduler().get_next_eta, schedule_data=cron(CRONS[sparsity]), from_date=FROM_DATE)
+
+
+@pytest.mark.parametrize('sparsity', sorted(CRONS))
+def test_cron_compiled(measure, sparsity):
+    compiled = Scheduler().compile(schedule_data=cron(CRONS[sparsity]))
+    measure(compiled.next_eta, from_date=FROM_DATE)
+
+
+@pytest.mark.parametrize('case', sorted(DST))
+def test_cron_dst(measure, case):
+    timezone, expression, from_date = DST[case]
+    compiled = Scheduler().compile(schedule_data=cron(expression, timezone))
+    measure(compiled.next_eta, from_date=from_date)
+
+
+@pytest.mark.parametrize('case', sorted(RECURRING))
+def test_recurring_count(measure, case):
+    payload = dict({'schedule_type': 'recurring', 'timezone': 'America/New_York', 'start_date': '01/01/2030',
+                    'start_time': '09:00 AM', 'count': 10000}, **RECURRING[case])
+    measure(Scheduler().get_next_eta, schedule_data=payload, from_date=FROM_DATE)
+
+
+def test_bulk_next_etas(measure):
+    payloads = bulk_payloads(10000)
+    measure(Scheduler().get_next_etas, payloads, from_date=FROM_DATE)
+
+
+def test_cli_batch(measure):
+    lines = [json.dumps(payload) for payload in bulk_payloads(10000)]
+    measure(lambda: run(iter(lines), io.StringIO(), FROM_DATE))
+
+
+def test_queue_pop_due(measure):
+    payloads = bulk_payloads(10000)
+
+    def pop_day():
+        queue = ScheduleQueue()
+        for index, payload in enumerate(payloads):
+            queue.add(index, payload, from_date=FROM_DATE)
+        queue.pop_due(now=FROM_DATE + datetime.timedelta(days=1))
+    measure(pop_day)
+
+
+def test_cronset_due_between(measure):
+    cronset = CronSet()
+    for index, payload in enumerate(bulk_payloads(10000)):
+        cronset.add(index, payload)
+    measure(cronset.due_between, FROM_DATE, FROM_DATE + datetime.timedelta(hours=1))
+
+
+@pytest.mark.parametrize('minutes', [1, 60 * 24])
+def test_cursor_clock_step(measure, minutes):
+    scheduler = Scheduler()
+    compiled = [scheduler.compile(schedule_data=payload) for payload in bulk_payloads(1000)]
+    cursors = [ScheduleCursor(schedule, from_date=FROM_DATE) for schedule in compiled * 100]
+    reference = [FROM_DATE]
+
+    def step():
+        # every round moves the 100k cursors `minutes` forward
+        reference[0] += datetime.timedelta(minutes=minutes)
+        move_all(cursors, reference[0])
+    measure(step)
+
+
+def test_store_load(measure, tmp_path):
+    store = ScheduleStore()
+    for payload in bulk_payloads(10000):
+        store.add(payload)
+    path = str(tmp_path / 'schedules.bin')
+    store.save(path)
+
+    def load():
+        ScheduleStore.load(path).close()
+    measure(load)
+
+
+def test_cold_import(benchmark):
+    command = [sys.executable, '-c', 'import scheduler']
+    benchmark.pedantic(subprocess.check_call, args=(command,), rounds=10, iterations=1)
+
+
+def test_cold_import_and_eta(benchmark):
+    command = [
+        sys.executable, '-c',
+        'import datetime, scheduler; scheduler.Scheduler().get_next_eta('
+        'schedule_data={"schedule_type": "cron", "timezone": "UTC", "cron": "0 9 * * *"})'
+    ]
+    benchmark.pedantic(subprocess.check_call, args=(command,), rounds=10, iterations=1)
@@ -0,0 +1,71 @@
+"""
+Benchmark options & fixtures
+
+Timings are gated by pytest-benchmark itself (`--benchmark-compare-fail`),
+peak memory (recorded as `extra_info['peak_memory']` in the saved JSON)
+by `--memory-baseline` / `--memory-threshold`.
+"""
+
+import json
+import pytest
+import tracemalloc
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('scheduler benchmarks')
+    group.addoption(
+        '--memory-baseline', default=None,
+        help="pytest-benchmark JSON file whose peak memory is the baseline")
+    group.addoption(
+        '--memory-threshold', type=float, default=0.2,
+        help="allowed peak memory growth over the baseline (0.2 = 20%%)")
+
+
+# nodeid -> peak memory of the benchmarks run in this session
+_peaks = {}
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _peaks:
+        return
+    terminalreporter.section('peak memory')
+    width = max(len(nodeid) for nodeid in _peaks)
+    for nodeid, peak in sorted(_peaks.items(), key=lambda item: item[1]):
+        terminalreporter.write_line("{}  {:>12,.1f} KiB".format(nodeid.ljust(width), peak / 1024.0))
+
+
+@pytest.fixture(scope='session')
+def memory_baseline(request):
+    path = request.config.getoption('--memory-baseline')
+    if path is None:
+        return {}
+    with open(path) as handle:
+        saved = json.load(handle)
+    return dict(
+        (bench['fullname'], bench['extra_info']['peak_memory'])
+        for bench in saved.get('benchmarks', []) if 'peak_memory' in bench.get('extra_info', {}))
+
+
+@pytest.fixture
+def measure(request, benchmark, memory_baseline):
+    """
+    Benchmarks `func(*args)` and records its peak memory (bytes) of one run
+    """
+    threshold = request.config.getoption('--memory-threshold')
+
+    def run(func, *args, **kwargs):
+        tracemalloc.start()
+        try:
+            func(*args, **kwargs)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info['peak_memory'] = peak
+        _peaks[request.node.nodeid] = peak
+        result = benchmark(func, *args, **kwargs)
+        baseline = memory_baseline.get(request.node.nodeid, None)
+        if baseline is not None and peak > baseline * (1 + threshold):
+            pytest.fail("peak memory {} bytes exceeds the baseline {} bytes by more than {:.0%}".format(
+                peak, baseline, threshold))
+        return result
+    return run
@@ -1 +1,3 @@
 from .scheduler import Scheduler
+from .compiled import CompiledSchedule
+from .schedule_queue import ScheduleQueue
@@ -0,0 +1,110 @@
+"""
+EtaCache
+"""
+
+import collections
+import datetime
+import hashlib
+import json
+import threading
+from .instrumentation import active
+from .utils import UTC, as_utc, epoch_minutes
+
+
+def payload_hash(schedule_data):
+    """
+    Which returns a digest of the payload independent of key order,
+    None if it can't be serialized
+    """
+    try:
+        canonical = json.dumps(schedule_data, sort_keys=True, separators=(',', ':'), default=repr)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).digest()
+
+
+class EtaCache(object):
+    """
+    Bounded, thread-safe LRU of etas keyed by (payload hash, reference minute).
+    Etas have minute resolution, so the same payload asked again within the
+    same minute gets the same answer. Entries whose eta passes while they are
+    cached are dropped when they are looked up.
+    """
+
+    def __init__(self, maxsize=4096):
+        if maxsize < 1:
+            raise ValueError("maxsize should be at least 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # (payload hash, reference minute) -> (eta, expiry minute or None)
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _now(self):
+        return datetime.datetime.now(UTC)
+
+    def get_or_compute(self, schedule_data, from_date, compute):
+        """
+        Which returns the cached eta of the payload for the minute of `from_date`
+        (defaults to now), calling `compute(reference)` on a miss.
+        Errors are raised and not cached.
+        """
+        if from_date is not None and not isinstance(from_date, datetime.datetime):
+            return compute(from_date)
+        digest = payload_hash(schedule_data)
+        if digest is None:
+            return compute(from_date)
+        now = self._now()
+        reference = now if from_date is None else as_utc(from_date)
+        key = (digest, epoch_minutes(reference))
+        collector = active()
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is not None:
+                if entry[1] is not None and entry[1] <= epoch_minutes(now):
+                    del self._entries[key]
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    if collector is not None:
+                        collector.increment('cache_hits')
+                    return entry[0]
+            self.misses += 1
+        if collector is not None:
+            collector.increment('cache_misses')
+
+        eta = compute(reference)
+        expiry = None
+        if eta is not None and epoch_minutes(eta) > epoch_minutes(now):
+            expiry = epoch_minutes(eta)
+        with self._lock:
+            self._entries[key] = (eta, expiry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return eta
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Which returns the counters and the current size
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'size': len(self._entries),
+            }
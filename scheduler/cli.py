@@ -0,0 +1,155 @@
+"""
+Command line batch runner
+
+Streams schema payloads, one JSON object per line, and writes one
+`{"id": .., "eta": ..}` (or `"etas"` / `"error"`) line per payload.
+Input is read lazily in chunks and at most `2 * workers` chunks are
+in flight, so memory stays bounded whatever the input size.
+"""
+
+import argparse
+import collections
+import datetime
+import itertools
+import json
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from .cache import EtaCache
+from .scheduler import Scheduler
+from .utils import UTC, as_utc
+
+# per process scheduler, identical payloads are computed once
+_scheduler = None
+
+
+def _get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler(cache=EtaCache())
+    return _scheduler
+
+
+def _from_date(value):
+    try:
+        return as_utc(datetime.datetime.fromisoformat(value))
+    except ValueError:
+        raise argparse.ArgumentTypeError("Invalid datetime {}".format(value))
+
+
+def _positive(value):
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError("expecting a positive integer, got {}".format(value))
+    return number
+
+
+def _chunks(lines, chunk_size):
+    """
+    Lazily groups the non blank lines into chunks of (line number, line)
+    """
+    numbered = ((number, line) for number, line in enumerate(lines, 1) if line.strip())
+    while True:
+        chunk = list(itertools.islice(numbered, chunk_size))
+        if not chunk:
+            return  # exit
+        yield chunk
+
+
+def _process_line(scheduler, number, line, from_date, count):
+    try:
+        payload = json.loads(line)
+    except ValueError as error:
+        return {'id': number, 'error': "Invalid JSON: {}".format(error)}
+    if not isinstance(payload, dict):
+        return {'id': number, 'error': "Invalid payload, expecting a JSON object"}
+    # the line number identifies payloads without an id
+    schedule_id = payload.pop('id', number)
+    try:
+        if count == 1:
+            eta = scheduler.get_next_eta(schedule_data=payload, from_date=from_date)
+            return {'id': schedule_id, 'eta': None if eta is None else eta.isoformat()}
+        etas = scheduler.iter_etas(schedule_data=payload, start=from_date, limit=count)
+        return {'id': schedule_id, 'etas': [eta.isoformat() for eta in etas]}
+    except Exception as error:
+        return {'id': schedule_id, 'error': "{}: {}".format(error.__class__.__name__, error)}
+
+
+def _process_chunk(chunk, from_date, count):
+    """
+    Which returns the output lines of a chunk as one string
+    """
+    scheduler = _get_scheduler()
+    return ''.join(
+        json.dumps(_process_line(scheduler, number, line, from_date, count)) + '\n'
+        for number, line in chunk
+    )
+
+
+def run(lines, output, from_date, count=1, workers=None, chunk_size=1000, ordered=True):
+    """
+    Writes the result line of every payload line to `output`.
+    With `workers` > 1 chunks are fanned out over a process pool, results
+    keep the input order unless `ordered` is False.
+    """
+    chunks = _chunks(lines, chunk_size)
+    if workers is None or workers <= 1:
+        for chunk in chunks:
+            output.write(_process_chunk(chunk, from_date, count))
+        return  # exit
+
+    in_flight = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if ordered:
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_process_chunk, chunk, from_date, count))
+                if len(pending) >= in_flight:
+                    output.write(pending.popleft().result())
+            while pending:
+                output.write(pending.popleft().result())
+            return  # exit
+
+        pending = set()
+        for chunk in chunks:
+            pending.add(executor.submit(_process_chunk, chunk, from_date, count))
+            if len(pending) >= in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    output.write(future.result())
+        for future in pending:
+            output.write(future.result())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m scheduler',
+        description="Computes the etas of schema payloads read as JSON lines")
+    parser.add_argument(
+        'input', nargs='?', default='-', help="JSON lines file, stdin when omitted or '-'")
+    parser.add_argument(
+        '--from-date', type=_from_date, default=None,
+        help="ISO 8601 reference datetime (naive values are UTC), defaults to now")
+    parser.add_argument(
+        '--count', type=_positive, default=1, help="number of etas per payload")
+    parser.add_argument(
+        '--workers', type=_positive, default=1, help="number of worker processes")
+    parser.add_argument(
+        '--chunk-size', type=_positive, default=1000, help="payloads per worker task")
+    parser.add_argument(
+        '--unordered', action='store_true', help="write results as soon as they are ready")
+    args = parser.parse_args(argv)
+
+    from_date = args.from_date
+    if from_date is None:
+        from_date = datetime.datetime.now(UTC)
+    if args.input == '-':
+        run(sys.stdin, sys.stdout, from_date, count=args.count, workers=args.workers,
+            chunk_size=args.chunk_size, ordered=not args.unordered)
+    else:
+        with open(args.input) as lines:
+            run(lines, sys.stdout, from_date, count=args.count, workers=args.workers,
+                chunk_size=args.chunk_size, ordered=not args.unordered)
+    sys.stdout.flush()
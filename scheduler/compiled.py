@@ -0,0 +1,256 @@
+"""
+Compiled schedules
+"""
+
+import bisect
+import datetime
+from .cron import compile_cron
+from .instrumentation import active, clock
+from .tz import get_tzinfo, is_valid_timezone
+from .utils import UTC, as_utc, epoch_minutes, from_epoch_minutes
+
+# fields `CompiledSchedule.replace` accepts per schedule type, the others are
+# derived from them or fixed at compile time
+REPLACEABLE = {
+    'cron': ('timezone', 'start', 'end', 'cron'),
+    'recurring': ('end',),
+    'date_specific': ('dates',),
+}
+
+
+def merge_dates(dates, added=(), removed=()):
+    """
+    Which returns the sorted, de-duplicated tuple of epoch minutes
+    with `added` inserted and `removed` deleted
+    """
+    dates = list(dates)
+    for minute in sorted(set(added)):
+        index = bisect.bisect_left(dates, minute)
+        if index == len(dates) or dates[index] != minute:
+            dates.insert(index, minute)
+    for minute in set(removed):
+        index = bisect.bisect_left(dates, minute)
+        if index < len(dates) and dates[index] == minute:
+            del dates[index]
+    return tuple(dates)
+
+
+class CompiledSchedule(object):
+    """
+    Immutable, hashable form of a schedule payload.
+    Everything is parsed and validated once by `Scheduler.compile`,
+    `next_eta` only does datetime arithmetic.
+    date_specific schedules are kept as a sorted tuple of UTC epoch minutes (`dates`).
+    """
+
+    __slots__ = ('schedule_type', 'timezone', 'tzinfo', 'start', 'end',
+                 'cron', 'dates', 'expression')
+
+    def __init__(self, schedule_type=None, timezone=None, tzinfo=None, start=None, end=None, cron=None, dates=(), expression=None):
+        set_attr = super(CompiledSchedule, self).__setattr__
+        set_attr('schedule_type', schedule_type)
+        set_attr('timezone', timezone)
+        set_attr('tzinfo', tzinfo)
+        set_attr('start', start)
+        set_attr('end', end)
+        set_attr('cron', cron)
+        set_attr('dates', tuple(dates))
+        set_attr('expression', expression)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CompiledSchedule is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("CompiledSchedule is immutable")
+
+    def _key(self):
+        return (self.schedule_type, self.timezone, self.start, self.end, self.cron, self.dates,
+                self.expression if self.schedule_type == 'recurring' else None)
+
+    def __eq__(self, other):
+        if not isinstance(other, CompiledSchedule):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return "CompiledSchedule(schedule_type={!r}, timezone={!r}, cron={!r})".format(
+            self.schedule_type, self.timezone, self.cron)
+
+    @property
+    def etas(self):
+        """
+        date_specific etas as UTC datetimes, sorted
+        """
+        return tuple(from_epoch_minutes(minute) for minute in self.dates)
+
+    def with_dates(self, added=(), removed=()):
+        """
+        Which returns a new date_specific `CompiledSchedule` with
+        the UTC datetimes in `added` inserted and the ones in `removed` deleted
+        """
+        if self.schedule_type != 'date_specific':
+            raise ValueError("Only date_specific schedules have dates")
+        dates = merge_dates(
+            self.dates,
+            added=[epoch_minutes(as_utc(eta)) for eta in added],
+            removed=[epoch_minutes(as_utc(eta)) for eta in removed])
+        return CompiledSchedule(
+            schedule_type=self.schedule_type, timezone=self.timezone, tzinfo=self.tzinfo, dates=dates)
+
+    def replace(self, **fields):
+        """
+        Which returns a new `CompiledSchedule` with the given fields replaced,
+        normalized like `Scheduler.compile` does: `expression` & `tzinfo` follow
+        `cron` & `timezone`, bounds are UTC and `dates` sorted epoch minutes
+        """
+        values = dict((name, getattr(self, name)) for name in self.__slots__)
+        for name in fields:
+            if name not in values:
+                raise TypeError("Unknown field {}".format(name))
+            if name not in REPLACEABLE.get(self.schedule_type, ()):
+                raise ValueError("{} can't be replaced on {} schedules".format(name, self.schedule_type))
+        values.update(fields)
+        if 'timezone' in fields:
+            if not is_valid_timezone(values['timezone']):
+                raise ValueError("Invalid timezone {}".format(values['timezone']))
+            values['tzinfo'] = get_tzinfo(values['timezone'])
+        if 'cron' in fields:
+            values['expression'] = compile_cron(values['cron'])
+        for name in ('start', 'end'):
+            if name in fields and values[name] is not None:
+                if not isinstance(values[name], datetime.datetime):
+                    raise ValueError("{} should be a datetime".format(name))
+                values[name] = as_utc(values[name])
+        if 'dates' in fields:
+            if not all(isinstance(minute, int) and not isinstance(minute, bool) for minute in values['dates']):
+                raise ValueError("dates should be epoch minutes")
+            values['dates'] = merge_dates((), added=values['dates'])
+        if values['start'] is not None and values['end'] is not None and values['end'] < values['start']:
+            raise ValueError("end_date_time should greater than start_date_time")
+        return CompiledSchedule(**values)
+
+    def next_eta(self, from_date=None):
+        """
+        Which returns the next eta (UTC) strictly after the minute of `from_date`,
+        `from_date` defaults to now, naive values are treated as UTC
+        """
+        reference = self._reference(from_date)
+        collector = active()
+        if collector is None:
+            return self._next_eta(reference)
+        started = clock()
+        eta = self._next_eta(reference)
+        collector.record('next_eta_' + self.schedule_type, clock() - started)
+        collector.increment('schedules_scanned')
+        if self.schedule_type == 'date_specific':
+            # probes of the bisect, not the number of dates
+            collector.increment('dates_searched', len(self.dates).bit_length())
+        return eta
+
+    def _next_eta(self, reference):
+        if self.schedule_type == 'date_specific':
+            return self._next_eta_date_specific(reference)
+        if self.schedule_type == 'cron':
+            return self._next_eta_cron(reference)
+        if self.schedule_type == 'recurring':
+            return self._next_eta_recurring(reference)
+        return None
+
+    def iter_etas(self, start=None, until=None, limit=None):
+        """
+        Generator of the etas (UTC) strictly after the minute of `start`
+        (defaults to now) up to `until` (inclusive), at most `limit` of them
+        """
+        reference = self._reference(start)
+        if until is not None:
+            until = self._reference(until)
+        if limit is not None and limit <= 0:
+            return  # exit
+
+        if self.schedule_type == 'date_specific':
+            source = self._iter_etas_date_specific(reference)
+        elif self.schedule_type == 'cron':
+            source = self._iter_etas_cron(reference)
+        elif self.schedule_type == 'recurring':
+            source = self._iter_etas_recurring(reference)
+        else:
+            return  # exit
+
+        count = 0
+        for eta in source:
+            if until is not None and eta > until:
+                return  # exit
+            yield eta
+            count += 1
+            if limit is not None and count >= limit:
+                return  # exit
+
+    def _reference(self, from_date):
+        if from_date is None:
+            return datetime.datetime.now(UTC)
+        if not isinstance(from_date, datetime.datetime):
+            raise ValueError("Invalid datetime reference")
+        return as_utc(from_date)
+
+    def _iter_etas_cron(self, reference):
+        if self.start is not None and reference < self.start:
+            reference = self.start
+        while True:
+            eta = self.expression.next_after(reference, self.tzinfo)
+            if eta is None or (self.end is not None and eta > self.end):
+                return  # exit
+            yield eta
+            reference = eta
+
+    def _iter_etas_recurring(self, reference):
+        while True:
+            eta = self.expression.next_after(reference)
+            if eta is None or (self.end is not None and eta > self.end):
+                return  # exit
+            yield eta
+            reference = eta
+
+    def _iter_etas_date_specific(self, reference):
+        dates = self.dates
+        index = bisect.bisect_right(dates, epoch_minutes(reference))
+        while index < len(dates):
+            yield from_epoch_minutes(dates[index])
+            index += 1
+
+    def _next_eta_date_specific(self, reference):
+        dates = self.dates
+        index = bisect.bisect_right(dates, epoch_minutes(reference))
+        if index == len(dates):
+            return None  # exit
+        return from_epoch_minutes(dates[index])
+
+    def _next_eta_cron(self, reference):
+        if self.end is not None and self.end < reference:
+            return None  # exit
+        if self.start is not None and reference < self.start:
+            reference = self.start
+        eta = self.expression.next_after(reference, self.tzinfo)
+        if eta is None:
+            return None  # exit
+        if self.end is not None and eta > self.end:
+            return None  # exit
+        return eta
+
+    def _next_eta_recurring(self, reference):
+        if self.end is not None and self.end < reference:
+            return None  # exit
+        eta = self.expression.next_after(reference)
+        if eta is None:
+            return None  # exit
+        if self.end is not None and eta > self.end:
+            return None  # exit
+        return eta
@@ -0,0 +1,376 @@
+"""
+Cron engine
+
+Each field of a 5 field cron expression is compiled into an integer
+bitmask (bit `n` set means value `n` matches) and the next fire time is
+found by jumping straight to the next set bit of the month, day, hour
+and minute masks instead of stepping through the calendar.
+"""
+
+import datetime
+import functools
+from .instrumentation import active
+from .tz import get_table
+from .utils import UTC, epoch_minutes, from_epoch_minutes
+
+MONTH_ALPHAS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+DOW_ALPHAS = {
+    'sun': 0, 'mon': 1, 'tue': 2, 'wed': 3, 'thu': 4, 'fri': 5, 'sat': 6
+}
+
+# (min, max, alphas) for minute, hour, day of month, month, day of week
+FIELDS = (
+    (0, 59, {}),
+    (0, 23, {}),
+    (1, 31, {}),
+    (1, 12, MONTH_ALPHAS),
+    (0, 7, DOW_ALPHAS),
+)
+
+# The calendar repeats itself every 400 years
+MAX_YEARS = 400
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+MINUTES_PER_DAY = 1440
+
+ALL_HOURS = (1 << 24) - 1
+
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _next_bit(mask, start):
+    """
+    Position of the lowest set bit of `mask` at or above `start`, -1 if none
+    """
+    mask >>= start
+    if not mask:
+        return -1
+    return start + (mask & -mask).bit_length() - 1
+
+
+def _mask(low, high, step=1):
+    mask = 0
+    for value in range(low, high + 1, step):
+        mask |= 1 << value
+    return mask
+
+
+def _days_in_month(year, month):
+    if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        return 29
+    return _DAYS_IN_MONTH[month]
+
+
+def _parse_value(value, field):
+    low, high, alphas = FIELDS[field]
+    value = value.lower()
+    if value in alphas:
+        return alphas[value]
+    if not value.isdigit():
+        raise ValueError("Invalid value {}".format(value))
+    value = int(value)
+    if value < low or value > high:
+        raise ValueError("Value {} out of range".format(value))
+    return value
+
+
+def _parse_field(expression, field):
+    """
+    Which returns the bitmask for one field of the expression
+    """
+    low, high, alphas = FIELDS[field]
+    mask = 0
+    for item in expression.split(','):
+        step = 1
+        stepped = '/' in item
+        if stepped:
+            item, step = item.split('/', 1)
+            if not step.isdigit() or int(step) == 0:
+                raise ValueError("Invalid step {}".format(step))
+            step = int(step)
+        if item in ('*', '?'):
+            if item == '?' and field not in (2, 4):
+                raise ValueError("`?` is only allowed in day fields")
+            start, end = low, high
+        elif '-' in item:
+            start, end = item.split('-', 1)
+            start, end = _parse_value(start, field), _parse_value(end, field)
+            if start > end:
+                raise ValueError("Unsupported range {}".format(item))
+        else:
+            start = _parse_value(item, field)
+            end = high if stepped else start
+        mask |= _mask(start, end, step)
+    return mask
+
+
+class CronExpression(object):
+    """
+    Native 5 field cron expression.
+    Day of month and day of week are OR'ed when both are restricted (like croniter).
+    """
+
+    __slots__ = ('expression', 'minutes', 'hours', 'days', 'months', 'weekdays',
+                 'last_day', 'day_or', 'dom_star', 'dow_star', '_weekday_days', '_never')
+
+    def __init__(self, expression):
+        if not isinstance(expression, str):
+            raise TypeError("invalid cron")
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError("Invalid cron specified {}".format(expression))
+        self.expression = expression
+        self.minutes = _parse_field(fields[0], 0)
+        self.hours = _parse_field(fields[1], 1)
+        dom = fields[2]
+        self.last_day = False
+        if dom.upper() == 'L':
+            self.last_day = True
+            self.days = 0
+        else:
+            self.days = _parse_field(dom, 2)
+        self.months = _parse_field(fields[3], 3)
+        weekdays = _parse_field(fields[4], 4)
+        if weekdays & (1 << 7):
+            weekdays = (weekdays | 1) & ~(1 << 7)
+        self.weekdays = weekdays
+
+        full_days = self.days == _mask(1, 31)
+        full_weekdays = self.weekdays == _mask(0, 6)
+        self.dom_star = dom in ('*', '?') or (full_days and '*' in fields[4])
+        self.dow_star = fields[4] in ('*', '?') or (full_weekdays and '*' in dom)
+        self._derive()
+
+    @classmethod
+    def from_masks(cls, expression, minutes, hours, days, months, weekdays,
+                   last_day=False, dom_star=False, dow_star=False):
+        """
+        Which rebuilds an expression from the masks of a parsed one,
+        `expression` isn't parsed again
+        """
+        self = cls.__new__(cls)
+        self.expression = expression
+        self.minutes = minutes
+        self.hours = hours
+        self.days = days
+        self.months = months
+        self.weekdays = weekdays
+        self.last_day = last_day
+        self.dom_star = dom_star
+        self.dow_star = dow_star
+        self._derive()
+        return self
+
+    def _derive(self):
+        self.day_or = not self.dom_star and not self.dow_star
+
+        # days of a month (bits 1..31) matching the weekdays, by weekday of the 1st
+        self._weekday_days = tuple(
+            sum(1 << day for day in range(1, 32) if self.weekdays >> ((first + day - 1) % 7) & 1)
+            for first in range(7)
+        )
+        self._never = False
+        if not self.day_or and not self.dom_star:
+            self._never = not any(
+                self.last_day or _next_bit(self.days, 1) <= _days_in_month(2000, month)
+                for month in range(1, 13) if self.months >> month & 1
+            )
+
+    def _key(self):
+        return (self.minutes, self.hours, self.days, self.months, self.weekdays,
+                self.last_day, self.dom_star, self.dow_star)
+
+    def __eq__(self, other):
+        if not isinstance(other, CronExpression):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return "CronExpression({!r})".format(self.expression)
+
+    def day_mask(self, year, month):
+        """
+        Bitmask (bits 1..31) of the matching days of the given month
+        """
+        days_in_month = _days_in_month(year, month)
+        valid = (1 << (days_in_month + 1)) - 2
+        days = self.days
+        if self.last_day:
+            days |= 1 << days_in_month
+        if self.dow_star:
+            return days & valid
+        first = (datetime.date(year, month, 1).weekday() + 1) % 7
+        weekday_days = self._weekday_days[first]
+        if self.dom_star:
+            return weekday_days & valid
+        return (days | weekday_days) & valid
+
+    def match(self, value):
+        """
+        Whether the (local, naive) datetime matches the expression
+        """
+        return bool(
+            self.minutes >> value.minute & 1 and
+            self.hours >> value.hour & 1 and
+            self.months >> value.month & 1 and
+            self.day_mask(value.year, value.month) >> value.day & 1
+        )
+
+    def next_local(self, minute):
+        """
+        First matching wall clock minute (minutes since epoch) at or after `minute`
+        """
+        if self._never:
+            return None
+        days, rest = divmod(minute, MINUTES_PER_DAY)
+        date = datetime.date.fromordinal(EPOCH_ORDINAL + days)
+        year, month, day = date.year, date.month, date.day
+        hour, minute = divmod(rest, 60)
+        limit = year + MAX_YEARS
+        day_mask_for = None
+        day_mask = 0
+        while year <= limit:
+            next_month = _next_bit(self.months, month)
+            if next_month < 0:
+                year, month, day, hour, minute = year + 1, 1, 1, 0, 0
+                continue
+            if next_month != month:
+                month, day, hour, minute = next_month, 1, 0, 0
+            if day_mask_for != (year, month):
+                day_mask_for = (year, month)
+                day_mask = self.day_mask(year, month)
+            next_day = _next_bit(day_mask, day)
+            if next_day < 0:
+                month, day, hour, minute = month + 1, 1, 0, 0
+                continue
+            if next_day != day:
+                day, hour, minute = next_day, 0, 0
+            next_hour = _next_bit(self.hours, hour)
+            if next_hour < 0:
+                day, hour, minute = day + 1, 0, 0
+                continue
+            if next_hour != hour:
+                hour, minute = next_hour, 0
+            next_minute = _next_bit(self.minutes, minute)
+            if next_minute < 0:
+                hour, minute = hour + 1, 0
+                continue
+            days = datetime.date(year, month, day).toordinal() - EPOCH_ORDINAL
+            return days * MINUTES_PER_DAY + hour * 60 + next_minute
+        return None
+
+    def next_after(self, from_date, tzinfo):
+        """
+        Which returns the next eta (UTC) strictly after the minute of `from_date`.
+        Wall clock times repeated by a DST fall back fire on both occurrences.
+        Wall clock times skipped by a DST gap fire once at the end of the gap
+        for fixed hours and are skipped when the hour is a wildcard (like cron).
+        """
+        eta, iterations = self._next_after(from_date, tzinfo)
+        collector = active()
+        if collector is not None:
+            collector.increment('cron_iterations', iterations)
+        return eta
+
+    def _next_after(self, from_date, tzinfo):
+        """
+        Which returns (eta, number of `next_local` searches)
+        """
+        if from_date.tzinfo is None:
+            from_date = from_date.replace(tzinfo=UTC)
+        transitions = get_table(tzinfo)
+        start = epoch_minutes(from_date) + 1
+        offset, transition = transitions.lookup(start)
+        previous, changed_at = transitions.lookup(start - 1)
+        if changed_at == start and offset > previous and self.hours != ALL_HOURS:
+            # starting right at the end of a DST gap
+            wall = self.next_local(start + previous)
+            if wall is not None and wall < start + offset:
+                return from_epoch_minutes(start), 1
+        search_from = start + offset
+        wall = self.next_local(search_from)
+        iterations = 1
+        while wall is not None:
+            eta = wall - offset
+            if transition is None or eta < transition:
+                return from_epoch_minutes(eta), iterations
+            # the match lies beyond the next offset change
+            next_offset, next_transition = transitions.lookup(transition)
+            gap_end = transition + next_offset
+            if next_offset > offset and wall < gap_end and self.hours != ALL_HOURS:
+                return from_epoch_minutes(transition), iterations
+            if gap_end < search_from or wall < gap_end:
+                wall = self.next_local(gap_end)
+                iterations += 1
+            offset, transition, search_from = next_offset, next_transition, gap_end
+        return None, iterations
+
+
+class CroniterExpression(object):
+    """
+    croniter backed expression for syntax the native engine doesn't cover
+    (seconds, `#`, `W`, hashed expressions ...)
+    """
+
+    __slots__ = ('expression',)
+
+    def __init__(self, expression):
+        self.expression = expression
+
+    def __eq__(self, other):
+        if not isinstance(other, CroniterExpression):
+            return NotImplemented
+        return self.expression == other.expression
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.expression)
+
+    def __repr__(self):
+        return "CroniterExpression({!r})".format(self.expression)
+
+    def next_after(self, from_date, tzinfo):
+        if from_date.tzinfo is None:
+            from_date = from_date.replace(tzinfo=UTC)
+        from croniter import croniter
+        cronifier = croniter(self.expression, from_date.astimezone(tzinfo))
+        collector = active()
+        if collector is not None:
+            collector.increment('cron_iterations')
+        return cronifier.get_next(datetime.datetime).astimezone(UTC)
+
+
+def compile_cron(expression):
+    """
+    Which returns the native engine for the expression,
+    falls back to croniter for syntax the engine doesn't support
+    """
+    if not isinstance(expression, str):
+        raise TypeError("invalid cron")
+    return _compile_cron(expression)
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile_cron(expression):
+    try:
+        return CronExpression(expression)
+    except ValueError:
+        pass
+    from croniter import croniter
+    if not croniter.is_valid(expression):
+        raise ValueError("Invalid cron specified {}".format(expression))
+    return CroniterExpression(expression)
@@ -0,0 +1,233 @@
+"""
+CronSet
+"""
+
+import datetime
+from .compiled import CompiledSchedule
+from .cron import CronExpression, EPOCH_ORDINAL, MINUTES_PER_DAY, ALL_HOURS, _days_in_month
+from .scheduler import Scheduler
+from .tz import get_table
+from .utils import as_utc, epoch_minutes, from_epoch_minutes
+
+
+def _bits(mask, low, high):
+    return [value for value in range(low, high + 1) if mask >> value & 1]
+
+
+def _iter_bits(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class _Bucket(object):
+    """
+    Distinct cron expressions of one timezone. Each expression owns a slot `i`
+    and every field value `v` keeps a big int with bit `i` set when the
+    expression matches `v`, so matching a minute is a handful of ANDs/ORs
+    over all expressions at once.
+    """
+
+    __slots__ = ('transitions', 'slots', 'slot_of', 'free', 'minute', 'hour', 'dom',
+                 'month', 'dow', 'last_day', 'day_or', 'fixed_hour')
+
+    def __init__(self, tzinfo):
+        self.transitions = get_table(tzinfo)
+        # slot -> [expression, set of ids]
+        self.slots = []
+        self.slot_of = {}
+        self.free = []
+        self.minute = [0] * 60
+        self.hour = [0] * 24
+        self.dom = [0] * 32
+        self.month = [0] * 13
+        self.dow = [0] * 7
+        self.last_day = 0
+        self.day_or = 0
+        self.fixed_hour = 0
+
+    def __len__(self):
+        return len(self.slot_of)
+
+    def _toggle(self, slot, expression):
+        bit = 1 << slot
+        for table, mask, low, high in (
+                (self.minute, expression.minutes, 0, 59),
+                (self.hour, expression.hours, 0, 23),
+                (self.dom, expression.days, 1, 31),
+                (self.month, expression.months, 1, 12),
+                (self.dow, expression.weekdays, 0, 6)):
+            for value in _bits(mask, low, high):
+                table[value] ^= bit
+        if expression.last_day:
+            self.last_day ^= bit
+        if expression.day_or:
+            self.day_or ^= bit
+        if expression.hours != ALL_HOURS:
+            self.fixed_hour ^= bit
+
+    def add(self, expression, schedule_id):
+        slot = self.slot_of.get(expression, None)
+        if slot is None:
+            if self.free:
+                slot = self.free.pop()
+                self.slots[slot] = [expression, set()]
+            else:
+                slot = len(self.slots)
+                self.slots.append([expression, set()])
+            self.slot_of[expression] = slot
+            self._toggle(slot, expression)
+        self.slots[slot][1].add(schedule_id)
+
+    def discard(self, expression, schedule_id):
+        slot = self.slot_of[expression]
+        ids = self.slots[slot][1]
+        ids.discard(schedule_id)
+        if not ids:
+            self._toggle(slot, expression)
+            del self.slot_of[expression]
+            self.slots[slot] = None
+            self.free.append(slot)
+
+    def match_wall(self, wall):
+        """
+        Bits of the expressions matching the wall clock minute
+        """
+        days, rest = divmod(wall, MINUTES_PER_DAY)
+        hour, minute = divmod(rest, 60)
+        bits = self.minute[minute] & self.hour[hour]
+        if not bits:
+            return 0
+        date = datetime.date.fromordinal(EPOCH_ORDINAL + days)
+        bits &= self.month[date.month]
+        if not bits:
+            return 0
+        dom = self.dom[date.day]
+        if date.day == _days_in_month(date.year, date.month):
+            dom |= self.last_day
+        dow = self.dow[(date.weekday() + 1) % 7]
+        return bits & (((dom & dow) & ~self.day_or) | ((dom | dow) & self.day_or))
+
+    def match(self, minute):
+        """
+        Bits of the expressions firing at the UTC minute
+        """
+        transitions = self.transitions
+        offset, _ = transitions.lookup(minute)
+        bits = self.match_wall(minute + offset)
+        previous, transition = transitions.lookup(minute - 1)
+        if transition == minute and offset > previous:
+            # wall clock times skipped by the gap fire at its end for fixed hours
+            for wall in range(minute + previous, minute + offset):
+                bits |= self.match_wall(wall) & self.fixed_hour
+        return bits
+
+    def ids(self, bits):
+        for slot in _iter_bits(bits):
+            for schedule_id in self.slots[slot][1]:
+                yield schedule_id
+
+
+class CronSet(object):
+    """
+    Index of many cron schedules answering which of them fire in a minute.
+    Schedules are bucketed by timezone and identical expressions are shared,
+    expressions only croniter understands are checked one by one.
+    """
+
+    def __init__(self, scheduler=None):
+        self._scheduler = scheduler if scheduler is not None else Scheduler()
+        self._buckets = {}
+        # schedule_id -> compiled
+        self._schedules = {}
+        # schedule_id -> (start minute or None, end minute or None)
+        self._bounds = {}
+        self._fallback = {}
+
+    def __len__(self):
+        return len(self._schedules)
+
+    def __contains__(self, schedule_id):
+        return schedule_id in self._schedules
+
+    def add(self, schedule_id, schedule):
+        """
+        Registers a cron schema (or `CompiledSchedule`)
+        """
+        if schedule_id in self._schedules:
+            raise ValueError("Schedule {} already exists".format(schedule_id))
+        compiled = schedule
+        if not isinstance(compiled, CompiledSchedule):
+            compiled = self._scheduler.compile(schedule_data=schedule)
+        if compiled.schedule_type != 'cron':
+            raise ValueError("CronSet only accepts cron schedules")
+        self._schedules[schedule_id] = compiled
+        if compiled.start is not None or compiled.end is not None:
+            self._bounds[schedule_id] = (
+                None if compiled.start is None else epoch_minutes(compiled.start),
+                None if compiled.end is None else epoch_minutes(compiled.end))
+        if not isinstance(compiled.expression, CronExpression):
+            self._fallback[schedule_id] = compiled
+            return
+        bucket = self._buckets.get(compiled.timezone, None)
+        if bucket is None:
+            bucket = self._buckets[compiled.timezone] = _Bucket(compiled.tzinfo)
+        bucket.add(compiled.expression, schedule_id)
+
+    def remove(self, schedule_id):
+        """
+        Unregisters the schedule, raises KeyError if it is unknown
+        """
+        compiled = self._schedules.pop(schedule_id)
+        self._bounds.pop(schedule_id, None)
+        if self._fallback.pop(schedule_id, None) is not None:
+            return
+        bucket = self._buckets[compiled.timezone]
+        bucket.discard(compiled.expression, schedule_id)
+        if not len(bucket):
+            del self._buckets[compiled.timezone]
+
+    def _in_bounds(self, schedule_id, minute):
+        bounds = self._bounds.get(schedule_id, None)
+        if bounds is None:
+            return True
+        start, end = bounds
+        return (start is None or minute > start) and (end is None or minute <= end)
+
+    def _due(self, minute):
+        due = set()
+        for bucket in self._buckets.values():
+            bits = bucket.match(minute)
+            if bits:
+                due.update(bucket.ids(bits))
+        if self._fallback:
+            eta = from_epoch_minutes(minute)
+            previous = from_epoch_minutes(minute - 1)
+            for schedule_id, compiled in self._fallback.items():
+                if compiled.expression.next_after(previous, compiled.tzinfo) == eta:
+                    due.add(schedule_id)
+        if self._bounds:
+            due = set(schedule_id for schedule_id in due if self._in_bounds(schedule_id, minute))
+        return due
+
+    def due_at(self, minute):
+        """
+        Which returns the ids of the schedules firing at the (UTC) minute of `minute`,
+        naive values are treated as UTC
+        """
+        return self._due(epoch_minutes(as_utc(minute)))
+
+    def due_between(self, t0, t1):
+        """
+        Which returns [(eta, ids)] for every minute after `t0` up to `t1` (inclusive)
+        where at least one schedule fires
+        """
+        start = epoch_minutes(as_utc(t0)) + 1
+        end = epoch_minutes(as_utc(t1))
+        result = []
+        for minute in range(start, end + 1):
+            due = self._due(minute)
+            if due:
+                result.append((from_epoch_minutes(minute), due))
+        return result
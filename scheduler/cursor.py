@@ -0,0 +1,170 @@
+"""
+ScheduleCursor
+
+Keeps the next eta of one schedule after a moving reference. Edits
+(bounds, dates, cron) and new references first check whether the eta
+already known is still the answer and only search when it isn't.
+References and etas are kept as epoch minutes, so a cursor whose eta
+still holds costs a few integer comparisons and no allocation.
+"""
+
+import bisect
+import datetime
+from .compiled import CompiledSchedule
+from .scheduler import Scheduler
+from .utils import UTC, as_utc, epoch_minutes, from_epoch_minutes
+
+# default of the bounds `update` leaves as they are
+UNCHANGED = object()
+
+
+def _minute(value):
+    return None if value is None else epoch_minutes(value)
+
+
+def _reference_minute(from_date):
+    if from_date is None:
+        from_date = datetime.datetime.now(UTC)
+    elif not isinstance(from_date, datetime.datetime):
+        raise ValueError("Invalid datetime reference")
+    return epoch_minutes(as_utc(from_date))
+
+
+def _lower(schedule, reference):
+    """
+    Epoch minute the eta has to be strictly after
+    """
+    if schedule.schedule_type == 'cron' and schedule.start is not None:
+        return max(reference, epoch_minutes(schedule.start))
+    return reference
+
+
+def move_all(cursors, from_date=None):
+    """
+    Moves every cursor to the same reference (defaults to now), e.g. after
+    a clock correction, and returns the cursors whose eta changed
+    """
+    reference = _reference_minute(from_date)
+    return [cursor for cursor in cursors if cursor._move(reference)]
+
+
+class ScheduleCursor(object):
+    """
+    Next eta of a schema (or `CompiledSchedule`) strictly after the minute
+    of a reference, like `CompiledSchedule.next_eta`, kept up to date
+    across edits and reference changes
+    """
+
+    __slots__ = ('schedule', '_reference', '_eta')
+
+    def __init__(self, schedule, from_date=None, scheduler=None):
+        if not isinstance(schedule, CompiledSchedule):
+            scheduler = scheduler if scheduler is not None else Scheduler()
+            schedule = scheduler.compile(schedule_data=schedule)
+        self.schedule = schedule
+        self._reference = _reference_minute(from_date)
+        self._eta = self._search()
+
+    def __repr__(self):
+        return "ScheduleCursor(schedule={!r}, reference={}, eta={})".format(
+            self.schedule, self.reference, self.eta)
+
+    @property
+    def reference(self):
+        return from_epoch_minutes(self._reference)
+
+    @property
+    def eta(self):
+        """
+        Next eta (UTC) or None
+        """
+        return None if self._eta is None else from_epoch_minutes(self._eta)
+
+    def _search(self):
+        schedule = self.schedule
+        if schedule.schedule_type == 'date_specific':
+            dates = schedule.dates
+            index = bisect.bisect_right(dates, self._reference)
+            return dates[index] if index < len(dates) else None
+        return _minute(schedule._next_eta(from_epoch_minutes(self._reference)))
+
+    def move_to(self, from_date=None):
+        """
+        Moves the reference (defaults to now), returns whether the eta changed
+        """
+        return self._move(_reference_minute(from_date))
+
+    def _move(self, reference):
+        previous = self._reference
+        if reference == previous:
+            return False
+        self._reference = reference
+        eta = self._eta
+        if reference > previous:
+            # nothing after the old reference is nothing after a later one either
+            if eta is None or eta > reference:
+                return False
+        elif _lower(self.schedule, reference) == _lower(self.schedule, previous):
+            # both references are before the start of the schedule
+            return False
+        self._eta = self._search()
+        return self._eta != eta
+
+    def update(self, start=UNCHANGED, end=UNCHANGED, added=(), removed=(), cron=None, from_date=None):
+        """
+        Applies an edit of the schedule and optionally a new reference
+        (the current one is kept by default), returns whether the eta changed.
+        `start` & `end` are the new bounds of cron schedules (`end` only for
+        recurring ones, None removes a bound), `added` & `removed` UTC datetimes
+        of date_specific schedules and `cron` a new expression.
+        """
+        schedule = self.schedule
+        schedule_type = schedule.schedule_type
+        fields = {}
+        search = False
+        if start is not UNCHANGED:
+            if schedule_type != 'cron':
+                raise ValueError("Only cron schedules have a start bound")
+            fields['start'] = None if start is None else as_utc(start)
+        if end is not UNCHANGED:
+            if schedule_type == 'date_specific':
+                raise ValueError("date_specific schedules have no end bound")
+            fields['end'] = None if end is None else as_utc(end)
+        if cron is not None and cron != schedule.cron:
+            if schedule_type != 'cron':
+                raise ValueError("Only cron schedules have a cron")
+            fields['cron'] = cron
+            search = True
+        added = set(epoch_minutes(as_utc(eta)) for eta in added)
+        removed = set(epoch_minutes(as_utc(eta)) for eta in removed)
+        if added or removed:
+            schedule = schedule.with_dates(
+                added=[from_epoch_minutes(minute) for minute in added],
+                removed=[from_epoch_minutes(minute) for minute in removed])
+        if fields:
+            schedule = schedule.replace(**fields)
+        reference = self._reference if from_date is None else _reference_minute(from_date)
+
+        eta = previous = self._eta
+        lower = _lower(schedule, reference)
+        if lower < _lower(self.schedule, self._reference):
+            # occurrences between the new and the old lower bound weren't looked at
+            search = True
+        elif eta is not None and (eta <= lower or eta in removed):
+            search = True
+        if not search:
+            # `eta` is the first occurrence after `lower` up to the old end or None
+            old_end = _minute(self.schedule.end)
+            new_end = _minute(schedule.end)
+            if eta is None:
+                search = old_end is not None and (new_end is None or new_end > old_end)
+            elif new_end is not None and eta > new_end:
+                eta = None
+            for minute in added - removed:
+                if minute > lower and (eta is None or minute < eta):
+                    eta = minute
+
+        self.schedule = schedule
+        self._reference = reference
+        self._eta = self._search() if search else eta
+        return self._eta != previous
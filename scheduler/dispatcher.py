@@ -0,0 +1,122 @@
+"""
+AsyncScheduler
+"""
+
+import asyncio
+import datetime
+import logging
+from .schedule_queue import ScheduleQueue
+from .utils import UTC
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncScheduler(object):
+    """
+    Asyncio runner on top of `ScheduleQueue`.
+    Sleeps until the earliest eta across all schedules, wakes early when
+    schedules are added/updated/removed and runs due callbacks with at most
+    `concurrency` of them in flight.
+    Each callback is awaited as `callback(schedule_id, eta)`.
+    """
+
+    def __init__(self, scheduler=None, concurrency=10, on_lateness=None):
+        if concurrency < 1:
+            raise ValueError("concurrency should be at least 1")
+        self.queue = ScheduleQueue(scheduler=scheduler)
+        self.concurrency = concurrency
+        # called as on_lateness(schedule_id, eta, lateness_seconds)
+        self.on_lateness = on_lateness
+        self.lateness = {}
+        self._callbacks = {}
+        self._wakeup = None
+        self._semaphore = None
+        self._tasks = set()
+        self._running = False
+
+    def _now(self):
+        return datetime.datetime.now(UTC)
+
+    def _notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def add(self, schedule_id, schedule, callback):
+        """
+        Registers a schema (or `CompiledSchedule`) with its coroutine callback
+        """
+        eta = self.queue.add(schedule_id, schedule, from_date=self._now())
+        self._callbacks[schedule_id] = callback
+        self._notify()
+        return eta
+
+    def update(self, schedule_id, schedule, callback=None):
+        """
+        Replaces a schema (and optionally its callback), the pending sleep is woken to use the new eta
+        """
+        eta = self.queue.update(schedule_id, schedule, from_date=self._now())
+        if callback is not None:
+            self._callbacks[schedule_id] = callback
+        self._notify()
+        return eta
+
+    def remove(self, schedule_id):
+        """
+        Drops a schema & its callback, the pending sleep is woken so its eta no longer fires
+        """
+        self.queue.remove(schedule_id)
+        self._callbacks.pop(schedule_id, None)
+        self.lateness.pop(schedule_id, None)
+        self._notify()
+
+    async def _fire(self, schedule_id, eta, callback):
+        async with self._semaphore:
+            lateness = (self._now() - eta).total_seconds()
+            if schedule_id in self._callbacks:
+                # removed ids aren't tracked anymore
+                self.lateness[schedule_id] = lateness
+            if self.on_lateness is not None:
+                self.on_lateness(schedule_id, eta, lateness)
+            await callback(schedule_id, eta)
+
+    def _dispatch(self, now):
+        for schedule_id, eta in self.queue.pop_due(now=now):
+            callback = self._callbacks.get(schedule_id, None)
+            if callback is None:
+                continue
+            task = asyncio.ensure_future(self._fire(schedule_id, eta, callback))
+            self._tasks.add(task)
+            task.add_done_callback(self._done)
+
+    def _done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("callback failed", exc_info=task.exception())
+
+    async def run(self):
+        """
+        Runs until `stop` is called
+        """
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._running = True
+        try:
+            while self._running:
+                self._wakeup.clear()
+                self._dispatch(self._now())
+                upcoming = self.queue.peek_next()
+                timeout = None
+                if upcoming is not None:
+                    timeout = max((upcoming[1] - self._now()).total_seconds(), 0)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._running = False
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stop(self):
+        self._running = False
+        self._notify()
@@ -0,0 +1,128 @@
+"""
+FreeBusy
+"""
+
+import datetime
+import heapq
+from .compiled import CompiledSchedule
+from .scheduler import Scheduler
+from .utils import as_utc, epoch_minutes, from_epoch_minutes
+
+
+def _minutes(duration):
+    if isinstance(duration, datetime.timedelta):
+        duration = int(duration.total_seconds() // 60)
+    if not isinstance(duration, int) or isinstance(duration, bool) or duration < 1:
+        raise ValueError("duration should be at least one minute")
+    return duration
+
+
+class FreeBusy(object):
+    """
+    Busy intervals, free slots and conflicts of many schedules whose
+    occurrences last `duration` (minutes or timedelta).
+    Occurrences are expanded lazily per schedule and merged by start with
+    a heap, so a window costs O(occurrences * log(schedules)).
+    """
+
+    def __init__(self, schedules, duration, scheduler=None):
+        scheduler = scheduler if scheduler is not None else Scheduler()
+        self.duration = _minutes(duration)
+        if isinstance(schedules, dict):
+            schedules = schedules.items()
+        self._schedules = []
+        for schedule_id, schedule in schedules:
+            if not isinstance(schedule, CompiledSchedule):
+                schedule = scheduler.compile(schedule_data=schedule)
+            self._schedules.append((schedule_id, schedule))
+
+    def _window(self, start, end):
+        if not isinstance(start, datetime.datetime) or not isinstance(end, datetime.datetime):
+            raise ValueError("Invalid datetime reference")
+        start, end = epoch_minutes(as_utc(start)), epoch_minutes(as_utc(end))
+        if end < start:
+            raise ValueError("end should not be before start")
+        return start, end
+
+    def _occurrences(self, schedule_id, compiled, start, end):
+        # occurrences starting up to `duration` before the window still overlap it
+        for eta in compiled.iter_etas(start=from_epoch_minutes(start - self.duration), until=from_epoch_minutes(end)):
+            minute = epoch_minutes(eta)
+            if minute >= end:
+                return  # exit
+            yield minute, minute + self.duration, schedule_id
+
+    def _events(self, start, end):
+        """
+        (start minute, end minute, schedule id) of every occurrence overlapping
+        the window, ordered by start
+        """
+        streams = [
+            self._occurrences(schedule_id, compiled, start, end)
+            for schedule_id, compiled in self._schedules
+        ]
+        return heapq.merge(*streams, key=lambda event: event[0])
+
+    def _busy(self, start, end):
+        current = None
+        for event_start, event_end, _ in self._events(start, end):
+            event_start, event_end = max(event_start, start), min(event_end, end)
+            if current is not None and event_start <= current[1]:
+                if event_end > current[1]:
+                    current[1] = event_end
+                continue
+            if current is not None:
+                yield current[0], current[1]
+            current = [event_start, event_end]
+        if current is not None:
+            yield current[0], current[1]
+
+    def busy(self, start, end):
+        """
+        Which returns the merged [(start, end)] UTC intervals between
+        `start` and `end` where at least one schedule is busy
+        """
+        start, end = self._window(start, end)
+        return [
+            (from_epoch_minutes(busy_start), from_epoch_minutes(busy_end))
+            for busy_start, busy_end in self._busy(start, end)
+        ]
+
+    def free(self, start, end, min_duration=1):
+        """
+        Which returns the [(start, end)] UTC slots between `start` and `end`
+        where every schedule is free, at least `min_duration` long
+        """
+        start, end = self._window(start, end)
+        min_duration = _minutes(min_duration)
+        slots = []
+        cursor = start
+        for busy_start, busy_end in self._busy(start, end):
+            if busy_start - cursor >= min_duration:
+                slots.append((from_epoch_minutes(cursor), from_epoch_minutes(busy_start)))
+            cursor = max(cursor, busy_end)
+        if end - cursor >= min_duration:
+            slots.append((from_epoch_minutes(cursor), from_epoch_minutes(end)))
+        return slots
+
+    def conflicts(self, start, end):
+        """
+        Which returns [(schedule_id, other_id, overlap start, overlap end)]
+        for every pair of occurrences of different schedules overlapping
+        between `start` and `end`, ordered by the start of the later occurrence
+        """
+        start, end = self._window(start, end)
+        conflicts = []
+        # (end minute, sequence, schedule id) of the occurrences still running
+        active = []
+        for sequence, (event_start, event_end, schedule_id) in enumerate(self._events(start, end)):
+            while active and active[0][0] <= event_start:
+                heapq.heappop(active)
+            for other_end, _, other_id in active:
+                if other_id != schedule_id:
+                    conflicts.append((
+                        other_id, schedule_id,
+                        from_epoch_minutes(max(event_start, start)),
+                        from_epoch_minutes(min(event_end, other_end, end))))
+            heapq.heappush(active, (event_end, sequence, schedule_id))
+        return conflicts
@@ -0,0 +1,157 @@
+"""
+Instrumentation
+
+Opt-in per stage timings and counters. A collector is attached to a
+`Scheduler` (`Scheduler(collector=...)`) or installed for the current
+context with `collect()`. Public `Scheduler` calls decide once whether
+they are sampled and mark the collector active for their duration; the
+stages below them only look the active collector up, so without a
+collector the cost is a context variable lookup per stage.
+
+Any object with `sample()`, `record(stage, seconds)` and
+`increment(name, value)` can be used as collector.
+"""
+
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+
+# collector installed by `collect`
+_installed = contextvars.ContextVar('scheduler_collector', default=None)
+# collector of the sampled call in progress, False inside an unsampled call
+_active = contextvars.ContextVar('scheduler_active_collector', default=None)
+
+clock = time.perf_counter
+
+
+def active():
+    """
+    Which returns the collector recording the call in progress or None
+    """
+    return _active.get() or None
+
+
+@contextlib.contextmanager
+def collect(collector=None):
+    """
+    Installs `collector` (a new `Collector` by default) for the current context
+    """
+    if collector is None:
+        collector = Collector()
+    token = _installed.set(collector)
+    try:
+        yield collector
+    finally:
+        _installed.reset(token)
+
+
+def instrumented(stage):
+    """
+    Decorates public `Scheduler` methods: samples the call and times it as `stage`
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            collector = _active.get()
+            if collector is None:
+                collector = self.collector
+                if collector is None:
+                    collector = _installed.get()
+                    if collector is None:
+                        return func(self, *args, **kwargs)
+                if not collector.sample():
+                    collector = False
+                token = _active.set(collector)
+                try:
+                    return _timed(collector, stage, func, self, *args, **kwargs)
+                finally:
+                    _active.reset(token)
+            return _timed(collector, stage, func, self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _timed(collector, stage, func, *args, **kwargs):
+    if not collector:
+        return func(*args, **kwargs)
+    start = clock()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        collector.record(stage, clock() - start)
+
+
+class Collector(object):
+    """
+    Thread-safe aggregate of stage durations (count, total & max seconds)
+    and counters. `sample_rate` is the share of calls that are recorded.
+    """
+
+    def __init__(self, sample_rate=1.0):
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate should be between 0 and 1")
+        self.sample_rate = sample_rate
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def sample(self):
+        if self.sample_rate >= 1:
+            return True
+        import random
+        return random.random() < self.sample_rate
+
+    def record(self, stage, seconds):
+        with self._lock:
+            stats = self._stages.get(stage, None)
+            if stats is None:
+                self._stages[stage] = [1, seconds, seconds]
+                return
+            stats[0] += 1
+            stats[1] += seconds
+            if seconds > stats[2]:
+                stats[2] = seconds
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def as_dict(self):
+        """
+        Which returns {'stages': {stage: {'count', 'total', 'max'}}, 'counters': {name: value}}
+        """
+        with self._lock:
+            return {
+                'stages': dict(
+                    (stage, {'count': count, 'total': total, 'max': maximum})
+                    for stage, (count, total, maximum) in self._stages.items()),
+                'counters': dict(self._counters),
+            }
+
+    def to_prometheus(self, prefix='scheduler'):
+        """
+        Which returns the stages & counters in the Prometheus text exposition format
+        """
+        data = self.as_dict()
+        lines = [
+            '# HELP {}_stage_seconds Time spent per stage.'.format(prefix),
+            '# TYPE {}_stage_seconds summary'.format(prefix),
+        ]
+        for stage, stats in sorted(data['stages'].items()):
+            lines.append('{}_stage_seconds_sum{{stage="{}"}} {!r}'.format(prefix, stage, stats['total']))
+            lines.append('{}_stage_seconds_count{{stage="{}"}} {}'.format(prefix, stage, stats['count']))
+        lines.append('# HELP {}_stage_seconds_max Slowest call per stage.'.format(prefix))
+        lines.append('# TYPE {}_stage_seconds_max gauge'.format(prefix))
+        for stage, stats in sorted(data['stages'].items()):
+            lines.append('{}_stage_seconds_max{{stage="{}"}} {!r}'.format(prefix, stage, stats['max']))
+        for name, value in sorted(data['counters'].items()):
+            lines.append('# TYPE {}_{}_total counter'.format(prefix, name))
+            lines.append('{}_{}_total {}'.format(prefix, name, value))
+        return '\n'.join(lines) + '\n'
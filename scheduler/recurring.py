@@ -0,0 +1,496 @@
+"""
+Recurrence rules
+
+RRULE like rules (frequency, interval, by weekday, by month day) anchored
+at the start date & time. The next occurrence is found arithmetically from
+the anchor: the index of the period containing the reference is computed
+directly and only the (few) periods without a matching day are skipped.
+"""
+
+import bisect
+import datetime
+import functools
+from .cron import MAX_YEARS, _days_in_month
+from .tz import get_table
+from .utils import UTC, epoch_minutes, from_epoch_minutes
+
+FREQUENCIES = ('minutely', 'hourly', 'daily', 'weekly', 'monthly', 'yearly')
+# minutes per unit of the sub-daily frequencies
+STEPS = {'minutely': 1, 'hourly': 60}
+WEEKDAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+# the gregorian calendar, weekdays included, repeats every 400 years
+CYCLE_DAYS = 146097
+CYCLE_MONTHS = 4800
+# first day of a cycle
+_ORIGIN = datetime.date(2000, 1, 1).toordinal()
+_MAX_ORDINAL = datetime.date.max.toordinal()
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _parse_weekdays(values):
+    if values is None:
+        return ()
+    if not isinstance(values, (list, tuple)):
+        raise TypeError("Invalid type of by_weekday, expecting `list`")
+    weekdays = set()
+    for value in values:
+        if not isinstance(value, str) or value[:2].upper() not in WEEKDAYS:
+            raise ValueError("Invalid weekday {}".format(value))
+        weekdays.add(WEEKDAYS[value[:2].upper()])
+    return tuple(sorted(weekdays))
+
+
+def _parse_monthdays(values):
+    if values is None:
+        return ()
+    if not isinstance(values, (list, tuple)):
+        raise TypeError("Invalid type of by_monthday, expecting `list`")
+    monthdays = set()
+    for value in values:
+        if not _is_int(value) or value == 0 or not -31 <= value <= 31:
+            raise ValueError("Invalid month day {}".format(value))
+        monthdays.add(value)
+    return tuple(sorted(monthdays))
+
+
+@functools.lru_cache(maxsize=1024)
+def _month_days(length, first, weekdays, monthdays, default_day):
+    """
+    Days of a month of `length` days starting on weekday `first` passing
+    by_monthday & by_weekday, `default_day` only when neither is set
+    (all days when it is None)
+    """
+    if monthdays:
+        days = sorted(set(day if day > 0 else length + 1 + day for day in monthdays))
+        days = [day for day in days if 1 <= day <= length]
+    elif default_day is not None and not weekdays:
+        days = [default_day] if default_day <= length else []
+    else:
+        days = range(1, length + 1)
+    if weekdays:
+        days = [day for day in days if (first + day - 1) % 7 in weekdays]
+    return tuple(days)
+
+
+@functools.lru_cache(maxsize=64)
+def _cycle_occurrences(unit, modulus, weekdays, monthdays, default_month, default_day):
+    """
+    Occurrence days of the 400 year cycle starting in 2000, before the interval
+    is applied, grouped by the residue modulo `modulus` of their day offset
+    (`unit` 'day'), month offset ('month') or year offset ('year'):
+    residue -> (sorted day offsets, cumulative occurrence counts).
+    Month & year entries are the first day of a month and count its occurrence days.
+    """
+    groups = {}
+    offset = 0
+    for month in range(CYCLE_MONTHS):
+        length = _days_in_month(2000 + month // 12, month % 12 + 1)
+        days = ()
+        if default_month is None or month % 12 + 1 == default_month:
+            days = _month_days(length, (_ORIGIN + offset + 6) % 7, weekdays, monthdays, default_day)
+        if unit == 'day':
+            for day in days:
+                position = offset + day - 1
+                positions, counts = groups.setdefault(position % modulus, ([], [0]))
+                positions.append(position)
+                counts.append(counts[-1] + 1)
+        elif days:
+            residue = (month if unit == 'month' else month // 12) % modulus
+            positions, counts = groups.setdefault(residue, ([], [0]))
+            positions.append(offset)
+            counts.append(counts[-1] + len(days))
+        offset += length
+    return groups
+
+
+def _count_before(groups, residues, position):
+    """
+    Occurrences of the groups of `residues` at day offsets before `position`
+    """
+    count = 0
+    for residue in residues:
+        group = groups.get(residue, None)
+        if group is not None:
+            count += group[1][bisect.bisect_left(group[0], position)]
+    return count
+
+
+class RecurrenceRule(object):
+    """
+    Occurrences of a rule in a timezone, the anchor (naive wall clock datetime)
+    is the first one when it matches the rule.
+    minutely / hourly rules step in elapsed time, the others keep the wall
+    clock time of the anchor. by_weekday / by_monthday expand weekly, monthly
+    and yearly rules and limit the others (like RFC 5545 / dateutil).
+    Days missing in a month (31st, Feb 29) are skipped.
+    """
+
+    __slots__ = ('frequency', 'interval', 'anchor', 'timezone', 'weekdays', 'monthdays',
+                 '_table', '_anchor_minute', '_anchor_ordinal')
+
+    def __init__(self, frequency, anchor, timezone, interval=1, by_weekday=None, by_monthday=None):
+        if not isinstance(frequency, str) or frequency.lower() not in FREQUENCIES:
+            raise ValueError("Invalid frequency {}".format(frequency))
+        if not _is_int(interval) or interval < 1:
+            raise ValueError("interval should be a positive integer")
+        if not isinstance(anchor, datetime.datetime):
+            raise TypeError("Invalid type of anchor")
+        self.frequency = frequency.lower()
+        self.interval = interval
+        self.anchor = anchor.replace(second=0, microsecond=0, tzinfo=None)
+        self.timezone = timezone
+        self.weekdays = _parse_weekdays(by_weekday)
+        self.monthdays = _parse_monthdays(by_monthday)
+        self._table = get_table(timezone)
+        self._anchor_minute = epoch_minutes(self._table.localize(self.anchor))
+        self._anchor_ordinal = self.anchor.toordinal()
+
+    def _key(self):
+        return (self.frequency, self.interval, self.anchor, self.timezone, self.weekdays, self.monthdays)
+
+    def __eq__(self, other):
+        if not isinstance(other, RecurrenceRule):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return "RecurrenceRule(frequency={!r}, interval={!r}, anchor={!r}, timezone={!r})".format(
+            self.frequency, self.interval, self.anchor, self.timezone)
+
+    @property
+    def start(self):
+        """
+        The anchor as UTC datetime
+        """
+        return from_epoch_minutes(self._anchor_minute)
+
+    def _allowed_days(self, year, month, default_day=None):
+        """
+        Days of the month passing by_monthday & by_weekday, `default_day` only
+        when neither is set (all days when it is None)
+        """
+        return _month_days(
+            _days_in_month(year, month), datetime.date(year, month, 1).weekday(),
+            self.weekdays, self.monthdays, default_day)
+
+    def _day_allowed(self, date):
+        if self.weekdays and date.weekday() not in self.weekdays:
+            return False
+        if self.monthdays:
+            length = _days_in_month(date.year, date.month)
+            return any(
+                day == date.day or length + 1 + day == date.day for day in self.monthdays)
+        return True
+
+    def _next_allowed_day(self, ordinal):
+        """
+        First day (ordinal) at or after `ordinal` passing the filters
+        """
+        date = datetime.date.fromordinal(ordinal)
+        year, month, day = date.year, date.month, date.day
+        for _ in range(MAX_YEARS * 12):
+            for allowed in self._allowed_days(year, month):
+                if allowed >= day:
+                    return datetime.date(year, month, allowed).toordinal()
+            year, month, day = year + month // 12, month % 12 + 1, 1
+        return None
+
+    def _next_daily(self, ordinal):
+        interval = self.interval
+        anchor = self._anchor_ordinal
+        ordinal = anchor + -(-(ordinal - anchor) // interval) * interval
+        if not self.monthdays:
+            # weekdays of the candidates cycle within 7 periods
+            for _ in range(7):
+                if self._day_allowed(datetime.date.fromordinal(ordinal)):
+                    return ordinal
+                ordinal += interval
+            return None
+        date = datetime.date.fromordinal(ordinal)
+        year, month = date.year, date.month
+        for _ in range(MAX_YEARS * 12):
+            for day in self._allowed_days(year, month):
+                candidate = datetime.date(year, month, day).toordinal()
+                if candidate >= ordinal and (candidate - anchor) % interval == 0:
+                    return candidate
+            year, month = year + month // 12, month % 12 + 1
+        return None
+
+    def _next_weekly(self, ordinal):
+        interval = self.interval
+        week_start = self._anchor_ordinal - self.anchor.weekday()
+        offsets = self.weekdays or (range(7) if self.monthdays else (self.anchor.weekday(),))
+        week = (ordinal - week_start) // 7
+        for _ in range(MAX_YEARS * 53 // interval + 2):
+            if week % interval:
+                week += interval - week % interval
+                ordinal = week_start + week * 7
+            for offset in offsets:
+                candidate = week_start + week * 7 + offset
+                if candidate >= ordinal and self._day_allowed(datetime.date.fromordinal(candidate)):
+                    return candidate
+            week += interval
+            ordinal = week_start + week * 7
+        return None
+
+    def _next_monthly(self, ordinal):
+        interval = self.interval
+        date = datetime.date.fromordinal(ordinal)
+        anchor_month = self.anchor.year * 12 + self.anchor.month - 1
+        month = date.year * 12 + date.month - 1
+        day = date.day
+        if (month - anchor_month) % interval:
+            month += interval - (month - anchor_month) % interval
+            day = 1
+        for _ in range(MAX_YEARS * 12 // interval + 2):
+            year = month // 12
+            for allowed in self._allowed_days(year, month % 12 + 1, self.anchor.day):
+                if allowed >= day:
+                    return datetime.date(year, month % 12 + 1, allowed).toordinal()
+            month += interval
+            day = 1
+        return None
+
+    def _next_yearly(self, ordinal):
+        interval = self.interval
+        anchor = self.anchor
+        date = datetime.date.fromordinal(ordinal)
+        year, month, day = date.year, date.month, date.day
+        if (year - anchor.year) % interval:
+            year += interval - (year - anchor.year) % interval
+            month, day = 1, 1
+        for _ in range(MAX_YEARS // interval + 2):
+            if self.weekdays or self.monthdays:
+                for month in range(month, 13):
+                    for allowed in self._allowed_days(year, month):
+                        if allowed >= day:
+                            return datetime.date(year, month, allowed).toordinal()
+                    day = 1
+            elif anchor.day <= _days_in_month(year, anchor.month):
+                candidate = datetime.date(year, anchor.month, anchor.day).toordinal()
+                if candidate >= ordinal:
+                    return candidate
+            year += interval
+            month, day = 1, 1
+        return None
+
+    def _next_date(self, ordinal):
+        """
+        First occurrence day (ordinal) at or after `ordinal` of the wall clock frequencies
+        """
+        ordinal = max(ordinal, self._anchor_ordinal)
+        if self.frequency == 'daily':
+            return self._next_daily(ordinal)
+        if self.frequency == 'weekly':
+            return self._next_weekly(ordinal)
+        if self.frequency == 'monthly':
+            return self._next_monthly(ordinal)
+        return self._next_yearly(ordinal)
+
+    def _localize(self, ordinal):
+        wall = datetime.datetime.combine(datetime.date.fromordinal(ordinal), self.anchor.time())
+        return self._table.localize(wall)
+
+    def _next_sub_daily(self, minute):
+        step = STEPS[self.frequency] * self.interval
+        anchor = self._anchor_minute
+        eta = anchor + ((minute - anchor) // step + 1) * step
+        if not self.weekdays and not self.monthdays:
+            return from_epoch_minutes(eta)
+        for _ in range(MAX_YEARS * 366):
+            date = self._table.to_local(from_epoch_minutes(eta)).date()
+            if self._day_allowed(date):
+                return from_epoch_minutes(eta)
+            ordinal = self._next_allowed_day(date.toordinal() + 1)
+            if ordinal is None:
+                return None
+            midnight = epoch_minutes(self._table.localize(
+                datetime.datetime.combine(datetime.date.fromordinal(ordinal), datetime.time())))
+            eta = anchor + -(-(midnight - anchor) // step) * step
+        return None
+
+    def next_after(self, from_date):
+        """
+        Which returns the next occurrence (UTC) strictly after the minute of `from_date`,
+        the anchor is included when `from_date` is before it
+        """
+        if from_date.tzinfo is None:
+            from_date = from_date.replace(tzinfo=UTC)
+        minute = max(epoch_minutes(from_date), self._anchor_minute - 1)
+        if self.frequency in STEPS:
+            return self._next_sub_daily(minute)
+        ordinal = self._table.to_local(from_epoch_minutes(minute)).toordinal()
+        while True:
+            ordinal = self._next_date(ordinal)
+            if ordinal is None:
+                return None
+            eta = self._localize(ordinal)
+            if epoch_minutes(eta) > minute:
+                return eta
+            ordinal += 1
+
+    def _constant(self):
+        """
+        Whether every period holds the same days, so the n-th occurrence has a closed form
+        """
+        if self.frequency == 'weekly':
+            return not self.monthdays
+        if self.weekdays or self.monthdays:
+            return False
+        if self.frequency == 'monthly':
+            return self.anchor.day <= 28
+        if self.frequency == 'yearly':
+            return (self.anchor.month, self.anchor.day) != (2, 29)
+        return True
+
+    def _cycle_residues(self, cycle):
+        """
+        Residues of `_cycle_occurrences` the interval keeps in the `cycle`-th 400 year cycle from 2000
+        """
+        interval = self.interval
+        if self.frequency == 'daily':
+            return ((self._anchor_ordinal - _ORIGIN - cycle * CYCLE_DAYS) % interval,)
+        if self.frequency == 'weekly':
+            week_start = self._anchor_ordinal - self.anchor.weekday() - _ORIGIN - cycle * CYCLE_DAYS
+            return tuple((week_start + day) % (7 * interval) for day in range(7))
+        if self.frequency == 'monthly':
+            anchor_month = self.anchor.year * 12 + self.anchor.month - 1
+            return ((anchor_month - 2000 * 12 - cycle * CYCLE_MONTHS) % interval,)
+        return ((self.anchor.year - 2000 - cycle * 400) % interval,)
+
+    def _nth_cycle(self, index):
+        """
+        n-th occurrence day (ordinal) of the wall clock frequencies, counted over
+        400 year cycles whose occurrence days are tabulated once per rule shape
+        """
+        anchor = self.anchor
+        unit = 'day'
+        modulus = self.interval
+        default_month = default_day = None
+        if self.frequency == 'weekly':
+            modulus = 7 * self.interval
+        elif self.frequency in ('monthly', 'yearly'):
+            unit = 'month' if self.frequency == 'monthly' else 'year'
+            if not self.weekdays and not self.monthdays:
+                default_day = anchor.day
+                if unit == 'year':
+                    default_month = anchor.month
+        groups = _cycle_occurrences(unit, modulus, self.weekdays, self.monthdays, default_month, default_day)
+        cycle, position = divmod(self._anchor_ordinal - _ORIGIN, CYCLE_DAYS)
+        residues = self._cycle_residues(cycle)
+        if unit == 'day':
+            target = index + _count_before(groups, residues, position)
+        else:
+            # the month of the anchor is always kept, its days before the anchor aren't occurrences
+            days = self._allowed_days(anchor.year, anchor.month, default_day)
+            target = index + _count_before(groups, residues, position - anchor.day + 1) + bisect.bisect_left(days, anchor.day)
+        while True:
+            base = _ORIGIN + cycle * CYCLE_DAYS
+            if base + CYCLE_DAYS - 1 > _MAX_ORDINAL:
+                return None  # exit
+            total = _count_before(groups, residues, CYCLE_DAYS)
+            if target < total:
+                break
+            target -= total
+            cycle += 1
+            residues = self._cycle_residues(cycle)
+        if len(residues) == 1:
+            positions, counts = groups[residues[0]]
+            entry = bisect.bisect_right(counts, target) - 1
+            position, within = positions[entry], target - counts[entry]
+        else:
+            # weekly, single days of several residues
+            low, high = 0, CYCLE_DAYS - 1
+            while low < high:
+                middle = (low + high) // 2
+                if _count_before(groups, residues, middle + 1) > target:
+                    high = middle
+                else:
+                    low = middle + 1
+            position, within = low, 0
+        ordinal = base + position
+        if unit != 'day':
+            date = datetime.date.fromordinal(ordinal)
+            ordinal += self._allowed_days(date.year, date.month, default_day)[within] - 1
+        return ordinal
+
+    def _nth_sub_daily(self, index):
+        """
+        n-th occurrence (UTC) of minutely / hourly rules limited by by_weekday / by_monthday,
+        steps are counted per run of allowed days
+        """
+        step = STEPS[self.frequency] * self.interval
+        anchor = self._anchor_minute
+        ordinal = self._anchor_ordinal
+        for _ in range(MAX_YEARS * 366):
+            ordinal = self._next_allowed_day(ordinal)
+            if ordinal is None:
+                return None  # exit
+            end = ordinal + 1
+            while end - ordinal < 366 and self._day_allowed(datetime.date.fromordinal(end)):
+                end += 1
+            low = max(self._midnight(ordinal), anchor)
+            high = self._midnight(end)
+            first = anchor + -(-(low - anchor) // step) * step
+            count = max(-(-(high - first) // step), 0)
+            if index < count:
+                return from_epoch_minutes(first + index * step)
+            index -= count
+            ordinal = end
+        return None
+
+    def _midnight(self, ordinal):
+        return epoch_minutes(self._table.localize(
+            datetime.datetime.combine(datetime.date.fromordinal(ordinal), datetime.time())))
+
+    def nth(self, index):
+        """
+        Which returns the `index`-th (0 based) occurrence (UTC) or None
+        """
+        if index < 0:
+            raise ValueError("index should not be negative")
+        anchor = self.anchor
+        if self.frequency in STEPS:
+            if self.weekdays or self.monthdays:
+                return self._nth_sub_daily(index)
+            return from_epoch_minutes(self._anchor_minute + index * STEPS[self.frequency] * self.interval)
+        if not self._constant():
+            if self.frequency == 'daily' and not self.monthdays:
+                # the weekdays of the candidates cycle every 7 of them
+                matches = [
+                    step for step in range(7) if (anchor.weekday() + step * self.interval) % 7 in self.weekdays]
+                if not matches:
+                    return None  # exit
+                periods, position = divmod(index, len(matches))
+                ordinal = self._anchor_ordinal + (periods * 7 + matches[position]) * self.interval
+            else:
+                ordinal = self._nth_cycle(index)
+            if ordinal is None or ordinal > _MAX_ORDINAL:
+                return None  # exit
+            return self._localize(ordinal)
+        if self.frequency == 'daily':
+            return self._localize(self._anchor_ordinal + index * self.interval)
+        if self.frequency == 'weekly':
+            week_start = self._anchor_ordinal - anchor.weekday()
+            offsets = self.weekdays or (anchor.weekday(),)
+            first = [offset for offset in offsets if offset >= anchor.weekday()]
+            if index < len(first):
+                return self._localize(week_start + first[index])
+            week, position = divmod(index - len(first), len(offsets))
+            return self._localize(week_start + (week + 1) * self.interval * 7 + offsets[position])
+        if self.frequency == 'monthly':
+            month = anchor.year * 12 + anchor.month - 1 + index * self.interval
+            return self._localize(datetime.date(month // 12, month % 12 + 1, anchor.day).toordinal())
+        return self._localize(anchor.replace(year=anchor.year + index * self.interval).toordinal())
@@ -0,0 +1,139 @@
+"""
+ScheduleQueue
+"""
+
+import datetime
+import heapq
+import itertools
+from .compiled import CompiledSchedule
+from .scheduler import Scheduler
+from .utils import UTC, as_utc, epoch_minutes, from_epoch_minutes
+
+
+class ScheduleQueue(object):
+    """
+    Many schedules keyed by id, ordered by their next eta.
+    Backed by a binary heap of (eta minute, sequence, id) with lazy deletion,
+    removed/updated entries are skipped when they reach the top and the heap
+    is compacted once stale entries outnumber live ones.
+    """
+
+    def __init__(self, scheduler=None):
+        self._scheduler = scheduler if scheduler is not None else Scheduler()
+        self._heap = []
+        # schedule_id -> (compiled, sequence of the live heap entry or None)
+        self._entries = {}
+        self._sequence = itertools.count()
+        self._stale = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, schedule_id):
+        return schedule_id in self._entries
+
+    def _compile(self, schedule):
+        if isinstance(schedule, CompiledSchedule):
+            return schedule
+        return self._scheduler.compile(schedule_data=schedule)
+
+    def _push(self, schedule_id, compiled, eta):
+        if eta is None:
+            self._entries[schedule_id] = (compiled, None)
+            return
+        sequence = next(self._sequence)
+        self._entries[schedule_id] = (compiled, sequence)
+        heapq.heappush(self._heap, (epoch_minutes(eta), sequence, schedule_id))
+
+    def _discard(self, schedule_id):
+        compiled, sequence = self._entries.pop(schedule_id)
+        if sequence is not None:
+            self._stale += 1
+            if self._stale > len(self._heap) // 2:
+                self._compact()
+
+    def _compact(self):
+        entries = self._entries
+        self._heap = [
+            item for item in self._heap
+            if item[2] in entries and entries[item[2]][1] == item[1]
+        ]
+        heapq.heapify(self._heap)
+        self._stale = 0
+
+    def _top(self):
+        heap = self._heap
+        entries = self._entries
+        while heap:
+            minute, sequence, schedule_id = heap[0]
+            entry = entries.get(schedule_id, None)
+            if entry is not None and entry[1] == sequence:
+                return heap[0]
+            heapq.heappop(heap)
+            self._stale -= 1
+        return None
+
+    def add(self, schedule_id, schedule, from_date=None):
+        """
+        Registers a schema (or `CompiledSchedule`) and returns its next eta
+        """
+        if schedule_id in self._entries:
+            raise ValueError("Schedule {} already exists".format(schedule_id))
+        compiled = self._compile(schedule)
+        eta = compiled.next_eta(from_date=from_date)
+        self._push(schedule_id, compiled, eta)
+        return eta
+
+    def update(self, schedule_id, schedule, from_date=None):
+        """
+        Replaces the schedule registered under `schedule_id` and returns its next eta
+        """
+        compiled = self._compile(schedule)
+        self._discard(schedule_id)
+        eta = compiled.next_eta(from_date=from_date)
+        self._push(schedule_id, compiled, eta)
+        return eta
+
+    def remove(self, schedule_id):
+        """
+        Unregisters the schedule, raises KeyError if it is unknown
+        """
+        self._discard(schedule_id)
+
+    def get(self, schedule_id):
+        """
+        Which returns the `CompiledSchedule` registered under `schedule_id`
+        """
+        return self._entries[schedule_id][0]
+
+    def peek_next(self):
+        """
+        Which returns (schedule_id, eta) of the earliest schedule or None
+        """
+        top = self._top()
+        if top is None:
+            return None
+        return top[2], from_epoch_minutes(top[0])
+
+    def pop_due(self, now=None):
+        """
+        Which returns [(schedule_id, eta)] of every schedule due at or before `now`
+        ordered by eta. Fired schedules are rescheduled after `now`, so missed
+        runs are coalesced into one; schedules without a next eta stay registered
+        but leave the heap.
+        """
+        if now is None:
+            now = datetime.datetime.now(UTC)
+        now = as_utc(now)
+        cutoff = epoch_minutes(now)
+        due = []
+        while True:
+            top = self._top()
+            if top is None or top[0] > cutoff:
+                break
+            minute, sequence, schedule_id = heapq.heappop(self._heap)
+            due.append((schedule_id, from_epoch_minutes(minute)))
+        for schedule_id, eta in due:
+            compiled = self._entries[schedule_id][0]
+            self._push(schedule_id, compiled, compiled.next_eta(from_date=now))
+        return due
@@ -5,10 +5,15 @@ Scheduler
 __author__ = "Partha Saradhi Konda<parthasaradhi1992@gmail.com>"
 __version__ = 0.1
 
+import bisect
 import datetime
-import pytz
-from croniter import croniter
-from .enums import TIMEZONES
+import functools
+from .compiled import CompiledSchedule, merge_dates
+from .cron import compile_cron
+from .instrumentation import active, clock, instrumented
+from .recurring import RecurrenceRule
+from .tz import get_table, get_tzinfo, is_valid_timezone
+from .utils import UTC, epoch_minutes, from_epoch_minutes
 
 
 def timezone_required(func):
@@ -16,7 +21,7 @@ def timezone_required(func):
         timezone = kwargs.get('timezone', None)
         if timezone is None:
             raise ValueError("timezone is required")
-        if timezone not in TIMEZONES:
+        if not is_valid_timezone(timezone):
             raise ValueError("Invalid timezone {}".format(timezone))
         return func(*args, **kwargs)
     return wrapper
@@ -27,8 +32,8 @@ def validate_cron(func):
         cron = kwargs.get('cron', None)
         if not isinstance(cron, str):
             raise TypeError("invalid cron")
-        if not croniter.is_valid(cron):
-            raise ValueError("Invalid cron specified {}".format(cron))
+        # the native engine only loads croniter for syntax it doesn't cover
+        compile_cron(cron)
         return func(*args, **kwargs)
     return wrapper
 
@@ -44,29 +49,84 @@ def valid_schedule_type(func):
     return wrapper
 
 
+@functools.lru_cache(maxsize=4096)
+def _parse_time(value):
+    return datetime.datetime.strptime(value, "%I:%M %p").time()
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date(value, _format):
+    return datetime.datetime.strptime(value, _format)
+
+
+def _payload_key(schedule_data):
+    """
+    Hashable key of the fields deciding a cron eta, None if not applicable
+    """
+    if not isinstance(schedule_data, dict) or schedule_data.get('schedule_type', None) != 'cron':
+        return None
+    key = tuple(schedule_data.get(field, None) for field in (
+        'timezone', 'cron', 'start_date', 'start_time', 'end_date', 'end_time', '_format'))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _group_key(schedule_data):
+    if not isinstance(schedule_data, dict):
+        return ('', '')
+    return (str(schedule_data.get('timezone', '')), str(schedule_data.get('cron', '')))
+
+
+def _next_etas_chunk(payloads, from_date, scheduler=None):
+    """
+    Which returns the etas (or the raised errors) of a chunk of payloads,
+    identical cron payloads are evaluated once.
+    Worker processes get a plain `Scheduler`, the caller's cache & collector stay in its process
+    """
+    if scheduler is None:
+        scheduler = Scheduler()
+    results = []
+    memo = {}
+    for schedule_data in payloads:
+        key = _payload_key(schedule_data)
+        if key is not None and key in memo:
+            results.append(memo[key])
+            continue
+        try:
+            eta = scheduler.get_next_eta(schedule_data=schedule_data, from_date=from_date)
+        except Exception as error:
+            eta = error
+        if key is not None:
+            memo[key] = eta
+        results.append(eta)
+    return results
+
+
 class Scheduler(object):
 
-    def _combine_date_time(self, timezone=None, _format=None, start_date=None, start_time=None):
+    def __init__(self, cache=None, collector=None):
+        # optional `EtaCache` shared by `get_next_eta` calls
+        self.cache = cache
+        # optional instrumentation collector, see `scheduler.instrumentation`
+        self.collector = collector
+
+    def _parse_date_time(self, _format=None, start_date=None, start_time=None):
+        """
+        Which parses the date & time into a naive wall clock datetime
+        """
         _start_date = None
         _start_time = None
-        _start_date_time = None
-        _timezone = None
 
-        if start_date is None:
-            return None
-
-        if timezone is not None:
-            if not isinstance(timezone, str):
-                raise ValueError("invalid timezone")
-            _timezone = pytz.timezone(timezone)
         if start_time is not None:
             if not isinstance(start_time, datetime.time):
                 if not isinstance(start_time, str):
                     raise ValueError(
                         "Unable to parse the time {}".format(start_time))
                 try:
-                    _start_time = datetime.datetime.strptime(
-                        start_time, "%I:%M %p").time()
+                    _start_time = _parse_time(start_time)
                 except ValueError:
                     raise ValueError(
                         "Unable to parse the time {}".format(start_time))
@@ -77,36 +137,77 @@ class Scheduler(object):
             if _format is None:
                 raise ValueError("_format is not provided")  # exit
             try:
-                _start_date = datetime.datetime.strptime(
-                    start_date, _format)
+                _start_date = _parse_date(start_date, _format)
             except ValueError:
                 raise ValueError("Invalid format {}".format(_format))
         else:
             _start_date = start_date
 
-        _start_date_time = _start_date
-
         if _start_time is not None:
-            _start_date_time = datetime.datetime.combine(
-                _start_date_time, _start_time
-            )
+            return datetime.datetime.combine(_start_date, _start_time)
+        return _start_date
+
+    def _combine_date_time(self, timezone=None, _format=None, start_date=None, start_time=None):
+        _start_date_time = None
+        _timezone = None
+
+        if start_date is None:
+            return None
 
-        if _timezone is not None:
-            _start_date_time = _timezone.localize(_start_date_time)
+        if timezone is not None:
+            if not isinstance(timezone, str):
+                raise ValueError("invalid timezone")
+            _timezone = get_table(timezone)
+
+        collector = active()
+        if collector is None:
+            _start_date_time = self._parse_date_time(
+                _format=_format, start_date=start_date, start_time=start_time)
+            if _timezone is not None:
+                return _timezone.localize(_start_date_time)
+        else:
+            started = clock()
+            _start_date_time = self._parse_date_time(
+                _format=_format, start_date=start_date, start_time=start_time)
+            collector.record('parse', clock() - started)
+            if _timezone is not None:
+                started = clock()
+                _start_date_time = _timezone.localize(_start_date_time)
+                collector.record('localize', clock() - started)
+                return _start_date_time
 
-        _start_date_time = _start_date_time.astimezone(pytz.UTC)
+        _start_date_time = _start_date_time.astimezone(UTC)
         return _start_date_time
 
-    def get_next_eta_date_specific(self, timezone=None, _format=None, from_date=None, schedules=[]):
+    def _date_specific_dates(self, timezone=None, _format=None, schedules=[]):
         """
-        For multiple date & times
-        return: eta/None, message/None
+        Which normalizes the schedules once into a sorted tuple of UTC epoch minutes,
+        the schedules are not mutated
         """
-        eta = None
         if not schedules:
             raise ValueError("schedule info not provided")  # exit
         if not isinstance(schedules, list):
             raise TypeError("Invalid Type of schedule, expecting `list`")
+        dates = []
+        for schedule in schedules:
+            if not isinstance(schedule, dict):
+                raise TypeError(
+                    "Invalid type of schedule, expecting list of dicts")
+            if 'start_date' not in schedule and 'start_time' not in schedule:
+                raise ValueError(
+                    "start_date & start_time are required in schedules")  # exit
+            _eta = self._combine_date_time(
+                timezone=timezone, _format=_format, start_date=schedule.get('start_date', None), start_time=schedule.get('start_time', None))
+            dates.append(epoch_minutes(_eta))
+        return merge_dates((), added=dates)
+
+    def get_next_eta_date_specific(self, timezone=None, _format=None, from_date=None, schedules=[]):
+        """
+        For multiple date & times
+        return: eta/None, message/None
+        """
+        dates = self._date_specific_dates(
+            timezone=timezone, _format=_format, schedules=schedules)
 
         if from_date is not None:
             if not isinstance(from_date, datetime.datetime):
@@ -115,30 +216,11 @@ class Scheduler(object):
         else:
             current_datetime = datetime.datetime.now()
 
-        current_datetime = current_datetime.replace(tzinfo=pytz.UTC)
-
-        for schedule in schedules:
-            if not isinstance(schedule, dict):
-                raise TypeError(
-                    "Invalid type of schedule, expecting list of dicts")
-            if 'start_date' not in schedule and 'start_time' not in schedule:
-                raise ValueError(
-                    "start_date & start_time are required in schedules")  # exit
-            if timezone is not None:
-                schedule.update({
-                    'timezone': timezone})
-            schedule.update({
-                '_format': _format
-            })
-            # unpack won't cause arg error
-            _eta = self._combine_date_time(**schedule)
-            _eta = _eta.replace(second=0, microsecond=0)
-            current_datetime = current_datetime.replace(
-                second=30, microsecond=0)
-            if current_datetime <= _eta:
-                eta = _eta
-                break  # exit
-        return eta
+        current_datetime = current_datetime.replace(tzinfo=UTC)
+        index = bisect.bisect_right(dates, epoch_minutes(current_datetime))
+        if index == len(dates):
+            return None  # exit
+        return from_epoch_minutes(dates[index])
 
     @timezone_required
     @validate_cron
@@ -157,7 +239,7 @@ class Scheduler(object):
                     "end_date_time should greater than start_date_time")
         from_date_time = self._combine_date_time(
             timezone=timezone, start_date=from_date, _format=_format)
-        current_date_time = datetime.datetime.now().replace(tzinfo=pytz.UTC)
+        current_date_time = datetime.datetime.now().replace(tzinfo=UTC)
         if end_date_time is not None and end_date_time < current_date_time:
             return None
         # from_date -> start_date (precedence)
@@ -168,49 +250,140 @@ class Scheduler(object):
                 from_date_time = start_date_time
         if from_date_time < current_date_time:
             from_date_time = current_date_time
-        localized_timezone = pytz.timezone(timezone)
+        localized_timezone = get_tzinfo(timezone)
         if from_date_time.tzinfo is None:
-            from_date_time = localized_timezone.localize(from_date_time)
-        else:
-            from_date_time = from_date_time.astimezone(localized_timezone)
-        cronifier = croniter(cron, from_date_time)
-        eta = cronifier.get_next(datetime.datetime).astimezone(pytz.UTC)
+            from_date_time = get_table(timezone).localize(from_date_time)
+        eta = compile_cron(cron).next_after(from_date_time, localized_timezone)
         if eta is not None and end_date_time is not None:
             if eta > end_date_time:
                 return None  # exit
         return eta  # exit
 
+    @instrumented('compile')
     @valid_schedule_type
-    def get_next_eta(self, schedule_data={}):
+    def compile(self, schedule_data={}):
         """
-        Which accepts whole schema and returns the eta
+        Which accepts whole schema, parses & validates it once
+        and returns an immutable `CompiledSchedule`
         """
-        schedule_type = schedule_data.get('schedule_type', None)
+        schedule_type = schedule_data.get('schedule_type').lower()
         timezone = schedule_data.get('timezone', None)
         _format = schedule_data.get('_format', '%m/%d/%Y')
 
         if timezone is not None:
-            if timezone not in TIMEZONES:
+            if not is_valid_timezone(timezone):
                 raise ValueError("Invalid timezone {}".format(timezone))
 
-        eta = None
+        if schedule_type == 'date_specific':
+            dates = self._date_specific_dates(
+                timezone=timezone, _format=_format, schedules=schedule_data.get('schedules', []))
+            return CompiledSchedule(
+                schedule_type=schedule_type, timezone=timezone, dates=dates)
 
-        if schedule_type.lower() == 'date_specific':
-            schedules = schedule_data.get('schedules', [])
-            eta = self.get_next_eta_date_specific(
-                timezone=timezone, _format=_format, schedules=schedules)
+        if schedule_type == 'cron':
+            if timezone is None:
+                raise ValueError("timezone is required")
+            cron = schedule_data.get('cron', None)
+            expression = compile_cron(cron)
+            start_date_time = self._combine_date_time(
+                timezone=timezone, start_date=schedule_data.get('start_date', None), start_time=schedule_data.get('start_time', None), _format=_format)
+            end_date_time = self._combine_date_time(
+                timezone=timezone, start_date=schedule_data.get('end_date', None), start_time=schedule_data.get('end_time', None), _format=_format)
+            if end_date_time is not None and start_date_time is not None:
+                if end_date_time < start_date_time:
+                    raise ValueError(
+                        "end_date_time should greater than start_date_time")
+            return CompiledSchedule(
+                schedule_type=schedule_type, timezone=timezone, tzinfo=get_tzinfo(timezone), start=start_date_time, end=end_date_time, cron=cron, expression=expression)
 
-        if schedule_type.lower() == 'cron':
-            start_date = schedule_data.get('start_date', None)
-            start_time = schedule_data.get('start_time', None)
-            end_date = schedule_data.get('end_date', None)
-            end_time = schedule_data.get('end_time', None)
+        if timezone is None:
+            raise ValueError("timezone is required")
+        return self._compile_recurring(schedule_data, timezone, _format)
 
-            cron = schedule_data.get('cron', None)
-            if not isinstance(cron, str):
-                raise TypeError("invalid cron")
-            if not croniter.is_valid(cron):
-                raise ValueError("Invalid cron specified {}".format(cron))
-            eta = self.get_next_eta_cron(
-                timezone=timezone, _format=_format, start_date=start_date, start_time=start_time, end_date=end_date, end_time=end_time, cron=cron)
-        return eta
+    def _compile_recurring(self, schedule_data, timezone, _format):
+        """
+        Which builds the `RecurrenceRule` anchored at start_date & start_time,
+        `until` (a date, inclusive) and `count` are folded into the end bound
+        """
+        if schedule_data.get('start_date', None) is None:
+            raise ValueError("start_date is required")
+        anchor = self._parse_date_time(
+            _format=_format, start_date=schedule_data['start_date'], start_time=schedule_data.get('start_time', None))
+        if not isinstance(anchor, datetime.datetime):
+            anchor = datetime.datetime.combine(anchor, datetime.time())
+        rule = RecurrenceRule(
+            schedule_data.get('frequency', None), anchor, timezone,
+            interval=schedule_data.get('interval', 1),
+            by_weekday=schedule_data.get('by_weekday', None),
+            by_monthday=schedule_data.get('by_monthday', None))
+        start_date_time = rule.start
+        end_date_time = self._combine_date_time(
+            timezone=timezone, start_date=schedule_data.get('end_date', None), start_time=schedule_data.get('end_time', None), _format=_format)
+        if end_date_time is not None and end_date_time < start_date_time:
+            raise ValueError(
+                "end_date_time should greater than start_date_time")
+        bounds = [end_date_time]
+        until = schedule_data.get('until', None)
+        if until is not None:
+            until_date = self._parse_date_time(_format=_format, start_date=until)
+            bounds.append(get_table(timezone).localize(datetime.datetime.combine(
+                until_date, datetime.time(23, 59))))
+        count = schedule_data.get('count', None)
+        if count is not None:
+            if not isinstance(count, int) or isinstance(count, bool) or count < 1:
+                raise ValueError("count should be a positive integer")
+            bounds.append(rule.nth(count - 1))
+        bounds = [bound for bound in bounds if bound is not None]
+        return CompiledSchedule(
+            schedule_type='recurring', timezone=timezone, tzinfo=get_tzinfo(timezone), start=start_date_time, end=min(bounds) if bounds else None, expression=rule)
+
+    @instrumented('get_next_eta')
+    def get_next_eta(self, schedule_data={}, from_date=None):
+        """
+        Which accepts whole schema and returns the eta,
+        served from `self.cache` when one is set
+        """
+        if self.cache is not None:
+            return self.cache.get_or_compute(
+                schedule_data, from_date,
+                lambda reference: self.compile(schedule_data=schedule_data).next_eta(from_date=reference))
+        return self.compile(schedule_data=schedule_data).next_eta(from_date=from_date)
+
+    @instrumented('get_next_etas')
+    def get_next_etas(self, payloads, from_date=None, workers=None, chunk_size=1000):
+        """
+        Bulk `get_next_eta`, returns the etas in input order.
+        A payload that fails gets its exception in place of the eta, the batch isn't aborted.
+        Payloads are grouped by timezone & cron so shared work is done once and
+        the chunks are fanned out over `workers` processes.
+        In process `self.cache` & `self.collector` are used, worker processes use neither.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size should be at least 1")
+        if from_date is None:
+            from_date = datetime.datetime.now(UTC)
+        payloads = list(payloads)
+        order = sorted(range(len(payloads)), key=lambda index: _group_key(payloads[index]))
+        chunks = [
+            order[offset:offset + chunk_size] for offset in range(0, len(order), chunk_size)
+        ]
+        chunk_payloads = [[payloads[index] for index in chunk] for chunk in chunks]
+        if workers is None or workers <= 1:
+            chunk_results = [_next_etas_chunk(chunk, from_date, self) for chunk in chunk_payloads]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunk_results = list(executor.map(
+                    _next_etas_chunk, chunk_payloads, [from_date] * len(chunk_payloads)))
+        results = [None] * len(payloads)
+        for chunk, etas in zip(chunks, chunk_results):
+            for index, eta in zip(chunk, etas):
+                results[index] = eta
+        return results
+
+    def iter_etas(self, schedule_data={}, start=None, until=None, limit=None):
+        """
+        Which accepts whole schema and lazily yields the etas
+        after `start` up to `until`, at most `limit` of them
+        """
+        return self.compile(schedule_data=schedule_data).iter_etas(start=start, until=until, limit=limit)
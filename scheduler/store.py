@@ -0,0 +1,372 @@
+"""
+ScheduleStore
+
+Compiled schedules kept in columnar, fixed width arrays: one row of
+(kind, timezone index, start / end epoch minutes, reference, length) per
+schedule, cron expressions and recurrence rules interned in their own
+tables and the dates of all date_specific schedules in one shared array.
+The columns are saved as a versioned binary file which is loaded by
+memory mapping it read-only, so worker processes share the pages and
+start without parsing a single payload.
+
+File layout (native byte order, every block 8 byte aligned):
+
+    magic (8 bytes) | version (uint32) | header size (uint32) | JSON header | columns
+"""
+
+import array
+import bisect
+import datetime
+import json
+import mmap
+import struct
+import sys
+from .compiled import CompiledSchedule
+from .cron import CronExpression, compile_cron
+from .recurring import FREQUENCIES, RecurrenceRule, WEEKDAYS
+from .scheduler import Scheduler
+from .tz import get_tzinfo
+from .utils import UTC, as_utc, epoch_minutes, from_epoch_minutes
+
+MAGIC = b'SCHSTORE'
+VERSION = 1
+PREAMBLE = struct.Struct('=8sII')
+
+KINDS = ('date_specific', 'cron', 'recurring')
+# start / end of unbounded schedules
+NONE = -2 ** 63
+
+# cron_flags bits
+NATIVE, LAST_DAY, DOM_STAR, DOW_STAR = 1, 2, 4, 8
+
+# name -> typecode, in file order
+COLUMNS = (
+    ('kind', 'B'),
+    ('timezone', 'H'),
+    ('start', 'q'),
+    ('end', 'q'),
+    # cron / rule index, offset into `dates` for date_specific
+    ('ref', 'Q'),
+    # number of dates of date_specific schedules
+    ('length', 'I'),
+    ('dates', 'q'),
+    ('cron_minutes', 'Q'),
+    ('cron_hours', 'I'),
+    ('cron_days', 'I'),
+    ('cron_months', 'H'),
+    ('cron_weekdays', 'B'),
+    ('cron_flags', 'B'),
+    ('rule_frequency', 'B'),
+    ('rule_interval', 'I'),
+    # wall clock epoch minute of the anchor
+    ('rule_anchor', 'q'),
+    ('rule_weekdays', 'B'),
+    # bits 1..31 for 1..31, bits 32..62 for -1..-31
+    ('rule_monthdays', 'Q'),
+)
+
+_WEEKDAY_NAMES = dict((value, name) for name, value in WEEKDAYS.items())
+
+
+def _monthday_mask(monthdays):
+    return sum(1 << (day if day > 0 else 31 - day) for day in monthdays)
+
+
+def _monthdays(mask):
+    return [day if day < 32 else 31 - day for day in range(1, 63) if mask >> day & 1]
+
+
+def _align(offset):
+    return (offset + 7) // 8 * 8
+
+
+class ScheduleStore(object):
+    """
+    Append only store of compiled schedules addressed by their index
+    """
+
+    def __init__(self, scheduler=None):
+        self._scheduler = scheduler if scheduler is not None else Scheduler()
+        self._columns = dict((name, array.array(typecode)) for name, typecode in COLUMNS)
+        self._timezones = []
+        self._crons = []
+        # interning, built lazily for loaded stores
+        self._timezone_index = {}
+        self._cron_index = {}
+        self._rule_index = {}
+        self._writable = True
+        # mapped file and the memoryviews exported from it
+        self._buffer = None
+        self._views = []
+        # decoded objects by table index
+        self._tzinfos = {}
+        self._expressions = {}
+        self._rules = {}
+
+    def __len__(self):
+        return len(self._columns['kind'])
+
+    def _ensure_writable(self):
+        """
+        Copies memory mapped columns into arrays before the first append
+        """
+        if self._writable:
+            return
+        columns = self._columns
+        self._columns = dict(
+            (name, array.array(typecode, columns[name])) for name, typecode in COLUMNS)
+        self._timezone_index = dict((name, index) for index, name in enumerate(self._timezones))
+        self._cron_index = dict((cron, index) for index, cron in enumerate(self._crons))
+        self._rule_index = dict(
+            (self._rule_key(index), index) for index in range(len(self._columns['rule_frequency'])))
+        self._release()
+        self._writable = True
+
+    def _rule_key(self, index):
+        columns = self._columns
+        return (columns['rule_frequency'][index], columns['rule_interval'][index], columns['rule_anchor'][index],
+                columns['rule_weekdays'][index], columns['rule_monthdays'][index])
+
+    def _intern_timezone(self, timezone):
+        index = self._timezone_index.get(timezone, None)
+        if index is None:
+            index = self._timezone_index[timezone] = len(self._timezones)
+            self._timezones.append(timezone)
+        return index
+
+    def _intern_cron(self, compiled):
+        index = self._cron_index.get(compiled.cron, None)
+        if index is not None:
+            return index
+        columns = self._columns
+        index = self._cron_index[compiled.cron] = len(self._crons)
+        self._crons.append(compiled.cron)
+        expression = compiled.expression
+        if isinstance(expression, CronExpression):
+            columns['cron_minutes'].append(expression.minutes)
+            columns['cron_hours'].append(expression.hours)
+            columns['cron_days'].append(expression.days)
+            columns['cron_months'].append(expression.months)
+            columns['cron_weekdays'].append(expression.weekdays)
+            columns['cron_flags'].append(
+                NATIVE | (LAST_DAY if expression.last_day else 0) |
+                (DOM_STAR if expression.dom_star else 0) | (DOW_STAR if expression.dow_star else 0))
+        else:
+            # croniter only syntax, no masks
+            for name in ('cron_minutes', 'cron_hours', 'cron_days', 'cron_months', 'cron_weekdays', 'cron_flags'):
+                columns[name].append(0)
+        return index
+
+    def _intern_rule(self, rule):
+        key = (
+            FREQUENCIES.index(rule.frequency), rule.interval,
+            epoch_minutes(rule.anchor.replace(tzinfo=UTC)),
+            sum(1 << weekday for weekday in rule.weekdays), _monthday_mask(rule.monthdays))
+        index = self._rule_index.get(key, None)
+        if index is None:
+            columns = self._columns
+            index = self._rule_index[key] = len(columns['rule_frequency'])
+            for name, value in zip(
+                    ('rule_frequency', 'rule_interval', 'rule_anchor', 'rule_weekdays', 'rule_monthdays'), key):
+                columns[name].append(value)
+        return index
+
+    def add(self, schedule):
+        """
+        Appends a schema (or `CompiledSchedule`) and returns its index
+        """
+        compiled = schedule
+        if not isinstance(compiled, CompiledSchedule):
+            compiled = self._scheduler.compile(schedule_data=schedule)
+        if compiled.schedule_type not in KINDS:
+            raise ValueError("Invalid Scheduling Type")
+        self._ensure_writable()
+        columns = self._columns
+        kind = KINDS.index(compiled.schedule_type)
+        if kind == 0:
+            ref, length = len(columns['dates']), len(compiled.dates)
+            columns['dates'].extend(compiled.dates)
+        elif kind == 1:
+            ref, length = self._intern_cron(compiled), 0
+        else:
+            ref, length = self._intern_rule(compiled.expression), 0
+        columns['kind'].append(kind)
+        columns['timezone'].append(self._intern_timezone(compiled.timezone))
+        columns['start'].append(NONE if compiled.start is None else epoch_minutes(compiled.start))
+        columns['end'].append(NONE if compiled.end is None else epoch_minutes(compiled.end))
+        columns['ref'].append(ref)
+        columns['length'].append(length)
+        return len(columns['kind']) - 1
+
+    def _tzinfo(self, index):
+        tzinfo = self._tzinfos.get(index, None)
+        if tzinfo is None:
+            tzinfo = self._tzinfos[index] = get_tzinfo(self._timezones[index])
+        return tzinfo
+
+    def _expression(self, index):
+        expression = self._expressions.get(index, None)
+        if expression is None:
+            columns = self._columns
+            flags = columns['cron_flags'][index]
+            if flags & NATIVE:
+                expression = CronExpression.from_masks(
+                    self._crons[index], columns['cron_minutes'][index], columns['cron_hours'][index],
+                    columns['cron_days'][index], columns['cron_months'][index],
+                    columns['cron_weekdays'][index], last_day=bool(flags & LAST_DAY),
+                    dom_star=bool(flags & DOM_STAR), dow_star=bool(flags & DOW_STAR))
+            else:
+                # croniter only syntax
+                expression = compile_cron(self._crons[index])
+            self._expressions[index] = expression
+        return expression
+
+    def _rule(self, index, timezone):
+        rule = self._rules.get((index, timezone), None)
+        if rule is None:
+            frequency, interval, anchor, weekdays, monthdays = self._rule_key(index)
+            rule = self._rules[(index, timezone)] = RecurrenceRule(
+                FREQUENCIES[frequency], from_epoch_minutes(anchor).replace(tzinfo=None),
+                self._timezones[timezone], interval=interval,
+                by_weekday=[_WEEKDAY_NAMES[weekday] for weekday in range(7) if weekdays >> weekday & 1],
+                by_monthday=_monthdays(monthdays))
+        return rule
+
+    def _bounds(self, index):
+        start = self._columns['start'][index]
+        end = self._columns['end'][index]
+        return (None if start == NONE else from_epoch_minutes(start),
+                None if end == NONE else from_epoch_minutes(end))
+
+    def get(self, index):
+        """
+        Which rebuilds the `CompiledSchedule` stored at `index`
+        """
+        columns = self._columns
+        kind = KINDS[columns['kind'][index]]
+        timezone = columns['timezone'][index]
+        ref = columns['ref'][index]
+        if kind == 'date_specific':
+            return CompiledSchedule(
+                schedule_type=kind, timezone=self._timezones[timezone],
+                dates=columns['dates'][ref:ref + columns['length'][index]])
+        start, end = self._bounds(index)
+        if kind == 'cron':
+            return CompiledSchedule(
+                schedule_type=kind, timezone=self._timezones[timezone], tzinfo=self._tzinfo(timezone),
+                start=start, end=end, cron=self._crons[ref], expression=self._expression(ref))
+        return CompiledSchedule(
+            schedule_type=kind, timezone=self._timezones[timezone], tzinfo=self._tzinfo(timezone),
+            start=start, end=end, expression=self._rule(ref, timezone))
+
+    def next_eta(self, index, from_date=None):
+        """
+        Which returns the next eta (UTC) of the schedule at `index` strictly
+        after the minute of `from_date`, like `CompiledSchedule.next_eta`
+        """
+        if from_date is None:
+            from_date = datetime.datetime.now(UTC)
+        if not isinstance(from_date, datetime.datetime):
+            raise ValueError("Invalid datetime reference")
+        reference = as_utc(from_date)
+        columns = self._columns
+        kind = columns['kind'][index]
+        if kind == 0:
+            # bisect over the shared dates, nothing is copied
+            dates = columns['dates']
+            low = columns['ref'][index]
+            high = low + columns['length'][index]
+            position = bisect.bisect_right(dates, epoch_minutes(reference), low, high)
+            if position == high:
+                return None  # exit
+            return from_epoch_minutes(dates[position])
+        return self.get(index).next_eta(from_date=reference)
+
+    def save(self, path):
+        """
+        Writes the store as a versioned binary file
+        """
+        columns = self._columns
+        header = {
+            'byteorder': sys.byteorder,
+            'timezones': self._timezones,
+            'crons': self._crons,
+            'columns': [],
+        }
+        offset = 0
+        for name, typecode in COLUMNS:
+            size = len(columns[name]) * array.array(typecode).itemsize
+            header['columns'].append([name, typecode, offset, len(columns[name])])
+            offset = _align(offset + size)
+        encoded = json.dumps(header).encode('utf-8')
+        start = _align(PREAMBLE.size + len(encoded))
+        with open(path, 'wb') as handle:
+            handle.write(PREAMBLE.pack(MAGIC, VERSION, len(encoded)))
+            handle.write(encoded)
+            handle.write(b'\0' * (start - PREAMBLE.size - len(encoded)))
+            written = 0
+            for name, typecode in COLUMNS:
+                data = memoryview(columns[name]).cast('B')
+                handle.write(data)
+                written += len(data)
+                handle.write(b'\0' * (_align(written) - written))
+                written = _align(written)
+
+    @classmethod
+    def load(cls, path, use_mmap=True, scheduler=None):
+        """
+        Which opens a saved store. With `use_mmap` the file is memory mapped
+        read-only and the columns are views on it (nothing is parsed or copied),
+        adding a schedule copies them into memory first.
+        """
+        with open(path, 'rb') as handle:
+            if use_mmap:
+                buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buffer = handle.read()
+        view = memoryview(buffer)
+        if len(view) < PREAMBLE.size:
+            raise ValueError("Not a schedule store file")
+        magic, version, size = PREAMBLE.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("Not a schedule store file")
+        if version != VERSION:
+            raise ValueError("Unsupported schedule store version {}".format(version))
+        header = json.loads(bytes(view[PREAMBLE.size:PREAMBLE.size + size]).decode('utf-8'))
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError("Schedule store was written with {} byte order".format(header['byteorder']))
+        start = _align(PREAMBLE.size + size)
+
+        store = cls(scheduler=scheduler)
+        views = [view]
+        columns = {}
+        for name, typecode, offset, length in header['columns']:
+            itemsize = array.array(typecode).itemsize
+            begin = start + offset
+            views.append(view[begin:begin + length * itemsize])
+            columns[name] = views[-1].cast(typecode)
+            views.append(columns[name])
+        store._columns = columns
+        store._views = views
+        store._timezones = header['timezones']
+        store._crons = header['crons']
+        store._writable = False
+        store._buffer = buffer
+        return store
+
+    def _release(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._buffer is not None and hasattr(self._buffer, 'close'):
+            self._buffer.close()
+        self._buffer = None
+
+    def close(self):
+        """
+        Releases the memory mapped file, the store is unusable afterwards
+        unless it was copied into memory
+        """
+        if not self._writable:
+            self._release()
+            self._columns = dict((name, array.array(typecode)) for name, typecode in COLUMNS)
@@ -0,0 +1,73 @@
+import datetime
+import pytz
+import unittest
+from ..cache import EtaCache
+from ..scheduler import Scheduler
+
+FROM_DATE = datetime.datetime(2099, 1, 1, tzinfo=pytz.UTC)
+
+
+class TestBulk(unittest.TestCase):
+
+    def payloads(self):
+        return [
+            {
+                'schedule_type': 'cron',
+                'timezone': 'Asia/Calcutta',
+                'cron': '30 10 * * *'
+            },
+            {
+                'schedule_type': 'cron',
+                'timezone': 'UTC',
+                'cron': '* x u s'
+            },
+            {
+                'schedule_type': 'date_specific',
+                'timezone': 'UTC',
+                'schedules': [{'start_date': '01/20/2099', 'start_time': '12:24 PM'}]
+            },
+            {
+                'schedule_type': 'cron',
+                'timezone': 'UTC',
+                'cron': '0 * * * *'
+            },
+            {
+                'schedule_type': 'cron',
+                'timezone': 'Asia/Calcutta',
+                'cron': '30 10 * * *'
+            }
+        ]
+
+    def assertResults(self, results):
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[0], datetime.datetime(2099, 1, 1, 5, 0, tzinfo=pytz.UTC))
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], datetime.datetime(2099, 1, 20, 12, 24, tzinfo=pytz.UTC))
+        self.assertEqual(results[3], datetime.datetime(2099, 1, 1, 1, 0, tzinfo=pytz.UTC))
+        self.assertEqual(results[4], results[0])
+
+    def test_get_next_etas(self):
+        scheduler = Scheduler()
+        self.assertResults(scheduler.get_next_etas(self.payloads(), from_date=FROM_DATE, chunk_size=2))
+
+    def test_get_next_etas_matches_get_next_eta(self):
+        scheduler = Scheduler()
+        payloads = self.payloads()
+        results = scheduler.get_next_etas(payloads, from_date=FROM_DATE)
+        self.assertEqual(results[3], scheduler.get_next_eta(schedule_data=payloads[3], from_date=FROM_DATE))
+
+    def test_get_next_etas_cache(self):
+        cache = EtaCache()
+        scheduler = Scheduler(cache=cache)
+        scheduler.get_next_eta(schedule_data=self.payloads()[3], from_date=FROM_DATE)
+        self.assertResults(scheduler.get_next_etas(self.payloads(), from_date=FROM_DATE))
+        self.assertEqual(cache.hits, 1)
+
+    def test_get_next_etas_process_pool(self):
+        scheduler = Scheduler()
+        self.assertResults(scheduler.get_next_etas(self.payloads(), from_date=FROM_DATE, workers=2, chunk_size=2))
+
+    def test_get_next_etas_invalid_chunk_size(self):
+        scheduler = Scheduler()
+        with self.assertRaises(ValueError):
+            scheduler.get_next_etas(self.payloads(), chunk_size=0)
@@ -0,0 +1,103 @@
+import datetime
+import pytz
+import threading
+import unittest
+from ..cache import EtaCache, payload_hash
+from ..scheduler import Scheduler
+
+FROM_DATE = datetime.datetime(2099, 1, 1, tzinfo=pytz.UTC)
+
+
+class FrozenCache(EtaCache):
+
+    now = datetime.datetime(2099, 1, 1, tzinfo=pytz.UTC)
+
+    def _now(self):
+        return self.now
+
+
+class TestEtaCache(unittest.TestCase):
+
+    def payload(self, cron='30 10 * * *'):
+        return {
+            'schedule_type': 'cron',
+            'timezone': 'Asia/Calcutta',
+            'cron': cron
+        }
+
+    def test_hit_within_minute(self):
+        scheduler = Scheduler(cache=EtaCache())
+        eta = scheduler.get_next_eta(schedule_data=self.payload(), from_date=FROM_DATE)
+        again = scheduler.get_next_eta(
+            schedule_data=self.payload(), from_date=FROM_DATE + datetime.timedelta(seconds=40))
+        self.assertEqual(eta, again)
+        self.assertEqual(eta, Scheduler().get_next_eta(schedule_data=self.payload(), from_date=FROM_DATE))
+        stats = scheduler.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_key_order_independent(self):
+        payload = self.payload()
+        reordered = dict(reversed(list(payload.items())))
+        self.assertEqual(payload_hash(payload), payload_hash(reordered))
+        self.assertNotEqual(payload_hash(payload), payload_hash(self.payload('31 10 * * *')))
+
+    def test_next_minute_misses(self):
+        scheduler = Scheduler(cache=EtaCache())
+        scheduler.get_next_eta(schedule_data=self.payload(), from_date=FROM_DATE)
+        scheduler.get_next_eta(
+            schedule_data=self.payload(), from_date=FROM_DATE + datetime.timedelta(minutes=1))
+        self.assertEqual(scheduler.cache.misses, 2)
+
+    def test_eviction(self):
+        scheduler = Scheduler(cache=EtaCache(maxsize=2))
+        for minute in range(3):
+            scheduler.get_next_eta(schedule_data=self.payload('{} * * * *'.format(minute)), from_date=FROM_DATE)
+        self.assertEqual(len(scheduler.cache), 2)
+        self.assertEqual(scheduler.cache.evictions, 1)
+        # most recently used entries survive
+        scheduler.get_next_eta(schedule_data=self.payload('2 * * * *'), from_date=FROM_DATE)
+        self.assertEqual(scheduler.cache.hits, 1)
+
+    def test_expires_when_eta_passed(self):
+        cache = FrozenCache()
+        scheduler = Scheduler(cache=cache)
+        eta = scheduler.get_next_eta(schedule_data=self.payload('5 0 * * *'), from_date=FROM_DATE)
+        cache.now = eta
+        scheduler.get_next_eta(schedule_data=self.payload('5 0 * * *'), from_date=FROM_DATE)
+        self.assertEqual(cache.expirations, 1)
+        self.assertEqual(cache.misses, 2)
+
+    def test_errors_not_cached(self):
+        scheduler = Scheduler(cache=EtaCache())
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                scheduler.get_next_eta(schedule_data=self.payload('* x u s'), from_date=FROM_DATE)
+        self.assertEqual(len(scheduler.cache), 0)
+        with self.assertRaises(ValueError):
+            scheduler.get_next_eta(schedule_data=self.payload(), from_date='01/01/2099')
+
+    def test_threads(self):
+        scheduler = Scheduler(cache=EtaCache(maxsize=8))
+        expected = [
+            Scheduler().get_next_eta(schedule_data=self.payload('{} * * * *'.format(minute)), from_date=FROM_DATE)
+            for minute in range(16)
+        ]
+        errors = []
+
+        def work():
+            for _ in range(20):
+                for minute in range(16):
+                    eta = scheduler.get_next_eta(
+                        schedule_data=self.payload('{} * * * *'.format(minute)), from_date=FROM_DATE)
+                    if eta != expected[minute]:
+                        errors.append(minute)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        stats = scheduler.cache.stats()
+        self.assertEqual(stats['hits'] + stats['misses'], 4 * 20 * 16)
+        self.assertLessEqual(stats['size'], 8)
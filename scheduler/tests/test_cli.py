@@ -0,0 +1,47 @@
+import datetime
+import io
+import json
+import pytz
+import unittest
+from ..cli import run
+
+FROM_DATE = datetime.datetime(2099, 1, 1, tzinfo=pytz.UTC)
+
+LINES = [
+    json.dumps({'id': 'report', 'schedule_type': 'cron', 'timezone': 'Asia/Calcutta', 'cron': '30 10 * * *'}),
+    '',
+    json.dumps({'schedule_type': 'cron', 'timezone': 'UTC', 'cron': '* x u s'}),
+    'not json',
+    json.dumps({'schedule_type': 'date_specific', 'timezone': 'UTC',
+                'schedules': [{'start_date': '01/20/2099', 'start_time': '12:24 PM'}]}),
+]
+
+
+class TestCli(unittest.TestCase):
+
+    def results(self, lines=LINES, **kwargs):
+        output = io.StringIO()
+        run(iter(lines), output, FROM_DATE, **kwargs)
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_results(self):
+        results = self.results()
+        self.assertEqual([result['id'] for result in results], ['report', 3, 4, 5])
+        self.assertEqual(results[0]['eta'], '2099-01-01T05:00:00+00:00')
+        self.assertTrue(results[1]['error'].startswith('ValueError'))
+        self.assertIn('Invalid JSON', results[2]['error'])
+        self.assertEqual(results[3]['eta'], '2099-01-20T12:24:00+00:00')
+
+    def test_count(self):
+        results = self.results(count=3)
+        self.assertEqual(results[0]['etas'], [
+            '2099-01-01T05:00:00+00:00', '2099-01-02T05:00:00+00:00', '2099-01-03T05:00:00+00:00'])
+        self.assertEqual(results[3]['etas'], ['2099-01-20T12:24:00+00:00'])
+
+    def test_workers(self):
+        expected = self.results()
+        self.assertEqual(self.results(workers=2, chunk_size=1), expected)
+        unordered = self.results(workers=2, chunk_size=1, ordered=False)
+        self.assertEqual(
+            sorted(unordered, key=lambda result: str(result['id'])),
+            sorted(expected, key=lambda result: str(result['id'])))
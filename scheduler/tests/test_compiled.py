@@ -0,0 +1,152 @@
+import datetime
+import pytz
+import unittest
+from ..cache import EtaCache
+from ..scheduler import Scheduler
+from ..compiled import CompiledSchedule
+
+
+class TestCompiled(unittest.TestCase):
+
+    def test_compile_invalid_cron(self):
+        scheduler = Scheduler()
+        with self.assertRaises(ValueError):
+            scheduler.compile(schedule_data={
+                'schedule_type': 'cron',
+                'timezone': 'Asia/Calcutta',
+                'cron': '* x u s'
+            })
+
+    def test_compile_cron_requires_timezone(self):
+        scheduler = Scheduler()
+        with self.assertRaises(ValueError):
+            scheduler.compile(schedule_data={
+                'schedule_type': 'cron',
+                'cron': '*/5 * * * *'
+            })
+
+    def test_invalid_schedule_type(self):
+        scheduler = Scheduler(cache=EtaCache())
+        for schedule_data in ({}, {'schedule_type': 'weekly', 'timezone': 'UTC'}):
+            with self.assertRaises(ValueError):
+                scheduler.get_next_eta(schedule_data=schedule_data)
+            with self.assertRaises(ValueError):
+                Scheduler().iter_etas(schedule_data=schedule_data)
+
+    def test_compiled_is_immutable_and_hashable(self):
+        scheduler = Scheduler()
+        payload = {
+            'schedule_type': 'cron',
+            'timezone': 'Asia/Calcutta',
+            'cron': '*/5 * * * *',
+            'start_date': '3/20/2099',
+            'start_time': '12:23 PM'
+        }
+        compiled = scheduler.compile(schedule_data=payload)
+        self.assertIsInstance(compiled, CompiledSchedule)
+        with self.assertRaises(AttributeError):
+            compiled.cron = '* * * * *'
+        self.assertEqual(compiled, scheduler.compile(schedule_data=payload))
+        self.assertEqual(len({compiled, scheduler.compile(schedule_data=payload)}), 1)
+
+    def test_compiled_cron_next_eta(self):
+        scheduler = Scheduler()
+        compiled = scheduler.compile(schedule_data={
+            'schedule_type': 'cron',
+            'timezone': 'Asia/Calcutta',
+            'cron': '*/5 * * * *',
+            'start_date': '3/20/2099',
+            'start_time': '12:23 PM'
+        })
+        # 12:25 PM IST
+        expected_datetime = datetime.datetime(2099, 3, 20, 6, 55, tzinfo=pytz.UTC)
+        self.assertEqual(compiled.next_eta(), expected_datetime)
+        self.assertEqual(compiled.next_eta(), expected_datetime)
+        self.assertEqual(
+            compiled.next_eta(from_date=datetime.datetime(2099, 3, 20, 7, 1)),
+            datetime.datetime(2099, 3, 20, 7, 5, tzinfo=pytz.UTC))
+
+    def test_compiled_cron_next_eta_after_end(self):
+        scheduler = Scheduler()
+        compiled = scheduler.compile(schedule_data={
+            'schedule_type': 'cron',
+            'timezone': 'Asia/Calcutta',
+            'cron': '0 10 * * *',
+            'start_date': '3/20/2099',
+            'end_date': '3/21/2099',
+            'end_time': '09:00 AM'
+        })
+        self.assertEqual(compiled.next_eta(), datetime.datetime(2099, 3, 20, 4, 30, tzinfo=pytz.UTC))
+        self.assertIsNone(compiled.next_eta(from_date=datetime.datetime(2099, 3, 20, 5, 0)))
+
+    def test_compiled_date_specific_does_not_mutate_payload(self):
+        scheduler = Scheduler()
+        schedules = [
+            {
+                'start_date': '01/20/2099',
+                'start_time': "12:24 PM"
+            },
+            {
+                'start_date': '02/20/2099',
+                'start_time': "12:24 PM"
+            }
+        ]
+        compiled = scheduler.compile(schedule_data={
+            'schedule_type': 'date_specific',
+            'timezone': 'Asia/Calcutta',
+            'schedules': schedules
+        })
+        self.assertEqual(schedules[0], {'start_date': '01/20/2099', 'start_time': "12:24 PM"})
+        first = datetime.datetime(2099, 1, 20, 6, 54, tzinfo=pytz.UTC)
+        second = datetime.datetime(2099, 2, 20, 6, 54, tzinfo=pytz.UTC)
+        self.assertEqual(compiled.next_eta(), first)
+        self.assertEqual(compiled.next_eta(from_date=first), second)
+        self.assertIsNone(compiled.next_eta(from_date=second))
+
+    def test_replace(self):
+        compiled = Scheduler().compile(schedule_data={
+            'schedule_type': 'cron',
+            'timezone': 'UTC',
+            'cron': '0 12 * * *',
+            'start_date': '01/01/2099'
+        })
+        end = datetime.datetime(2099, 1, 10, tzinfo=pytz.UTC)
+        bounded = compiled.replace(end=end)
+        self.assertEqual(bounded.end, end)
+        self.assertIsNone(compiled.end)
+        self.assertEqual(bounded.cron, compiled.cron)
+        with self.assertRaises(ValueError):
+            compiled.replace(end=datetime.datetime(2098, 1, 1, tzinfo=pytz.UTC))
+        with self.assertRaises(TypeError):
+            compiled.replace(schedule='cron')
+
+    def test_replace_normalizes(self):
+        compiled = Scheduler().compile(schedule_data={
+            'schedule_type': 'cron',
+            'timezone': 'UTC',
+            'cron': '0 9 * * *'
+        })
+        from_date = datetime.datetime(2099, 1, 1, tzinfo=pytz.UTC)
+        self.assertEqual(
+            compiled.replace(cron='15 * * * *').next_eta(from_date=from_date),
+            datetime.datetime(2099, 1, 1, 0, 15, tzinfo=pytz.UTC))
+        started = compiled.replace(start=datetime.datetime(2099, 1, 3))
+        self.assertEqual(started.start, datetime.datetime(2099, 1, 3, tzinfo=pytz.UTC))
+        self.assertEqual(started.next_eta(from_date=from_date), datetime.datetime(2099, 1, 3, 9, 0, tzinfo=pytz.UTC))
+        moved = compiled.replace(timezone='Asia/Calcutta')
+        self.assertEqual(moved.next_eta(from_date=from_date), datetime.datetime(2099, 1, 1, 3, 30, tzinfo=pytz.UTC))
+        for fields in ({'cron': '* x u s'}, {'timezone': 'Mars/Base'}, {'start': '01/03/2099'},
+                       {'dates': [1]}, {'expression': None}, {'tzinfo': pytz.UTC}, {'schedule_type': 'recurring'}):
+            with self.assertRaises(ValueError):
+                compiled.replace(**fields)
+
+        dated = Scheduler().compile(schedule_data={
+            'schedule_type': 'date_specific',
+            'timezone': 'UTC',
+            'schedules': [{'start_date': '01/20/2099', 'start_time': '12:24 PM'}]
+        })
+        minutes = [dated.dates[0] + offset for offset in (5, 3, 1, 3)]
+        self.assertEqual(dated.replace(dates=minutes).dates, tuple(sorted(set(minutes))))
+        for fields in ({'dates': ['01/20/2099']}, {'start': from_date}, {'cron': '* * * * *'}):
+            with self.assertRaises(ValueError):
+                dated.replace(**fields)
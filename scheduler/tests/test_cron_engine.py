@@ -0,0 +1,93 @@
+import datetime
+import pytz
+import random
+import unittest
+from croniter import croniter
+from ..cron import compile_cron, CronExpression, CroniterExpression
+
+CORPUS = [
+    '* * * * *', '*/5 * * * *', '0 9 29 2 *', '*/7 3 * * 1-5', '0 0 1 * *',
+    '30 2 * * *', '0 * * * *', '*/30 * * * *', '15 10 * * mon-fri', '0 0 * * 0',
+    '0 0 * * 7', '0 12 1,15 * *', '0 12 13 * 5', '0 0 L * *', '5/10 * * * *',
+    '0 0 */2 * *', '0 0 1-31 * 1', '0 0 * jan,jul sun', '45 23 31 * *',
+    '1-5 1-5 1-5 1-5 1-5', '0 0 * * 1-7', '0 9-17/2 * * 1-5', '59 23 * * 6',
+    '0 0 ? * mon', '0 4 8-14 * *'
+]
+
+ZONES = [
+    'UTC', 'Asia/Calcutta', 'Asia/Kathmandu', 'America/New_York',
+    'Europe/London', 'America/Santiago', 'Pacific/Chatham'
+]
+
+
+class TestCronEngine(unittest.TestCase):
+
+    def test_differential_against_croniter(self):
+        rand = random.Random(1)
+        for zone in ZONES:
+            tz = pytz.timezone(zone)
+            for expression in CORPUS:
+                compiled = compile_cron(expression)
+                self.assertIsInstance(compiled, CronExpression)
+                for _ in range(3):
+                    start = pytz.UTC.localize(datetime.datetime(2000, 1, 1) + datetime.timedelta(
+                        seconds=rand.randint(0, 36 * 365 * 86400)))
+                    cronifier = croniter(expression, start.astimezone(tz))
+                    eta = start
+                    for _ in range(5):
+                        expected = cronifier.get_next(datetime.datetime).astimezone(pytz.UTC)
+                        eta = compiled.next_after(eta, tz)
+                        self.assertEqual(eta, expected, (zone, expression, start))
+
+    def test_invalid_expression(self):
+        for expression in ['', '* x u s', '60 * * * *', '* * 0 * *', '*/0 * * * *']:
+            with self.assertRaises(ValueError):
+                compile_cron(expression)
+        with self.assertRaises(TypeError):
+            compile_cron(None)
+
+    def test_croniter_fallback(self):
+        compiled = compile_cron('0 0 * * 5#2')
+        self.assertIsInstance(compiled, CroniterExpression)
+        start = datetime.datetime(2019, 1, 1, tzinfo=pytz.UTC)
+        self.assertEqual(
+            compiled.next_after(start, pytz.UTC),
+            datetime.datetime(2019, 1, 11, tzinfo=pytz.UTC))
+
+    def test_impossible_expression(self):
+        compiled = compile_cron('0 0 31 2 *')
+        self.assertIsNone(compiled.next_after(datetime.datetime(2019, 1, 1), pytz.UTC))
+
+    def test_dst_gap(self):
+        tz = pytz.timezone('America/New_York')
+        start = datetime.datetime(2024, 3, 10, 5, 0, tzinfo=pytz.UTC)
+        # fixed hour inside the gap fires at the end of the gap
+        self.assertEqual(
+            compile_cron('30 2 * * *').next_after(start, tz),
+            datetime.datetime(2024, 3, 10, 7, 0, tzinfo=pytz.UTC))
+        # wildcard hour skips the gap
+        self.assertEqual(
+            compile_cron('30 * * * *').next_after(datetime.datetime(2024, 3, 10, 6, 30), tz),
+            datetime.datetime(2024, 3, 10, 7, 30, tzinfo=pytz.UTC))
+
+    def test_dst_gap_end_reference(self):
+        tz = pytz.timezone('America/New_York')
+        # starting on the last minute before the end of the gap, the collapsed 02:30 still fires
+        reference = datetime.datetime(2024, 3, 10, 6, 59, tzinfo=pytz.UTC)
+        expected = datetime.datetime(2024, 3, 10, 7, 0, tzinfo=pytz.UTC)
+        self.assertEqual(compile_cron('30 2 * * *').next_after(reference, tz), expected)
+        self.assertEqual(
+            croniter('30 2 * * *', reference.astimezone(tz)).get_next(datetime.datetime).astimezone(pytz.UTC),
+            expected)
+
+    def test_dst_fall_back(self):
+        tz = pytz.timezone('America/New_York')
+        compiled = compile_cron('30 1 * * *')
+        first = compiled.next_after(datetime.datetime(2024, 11, 3, 4, 0), tz)
+        second = compiled.next_after(first, tz)
+        self.assertEqual(first, datetime.datetime(2024, 11, 3, 5, 30, tzinfo=pytz.UTC))
+        self.assertEqual(second, datetime.datetime(2024, 11, 3, 6, 30, tzinfo=pytz.UTC))
+
+    def test_compiled_expressions_compare_by_value(self):
+        self.assertEqual(CronExpression('0 0 * * 7'), CronExpression('0 0 * * sun'))
+        self.assertEqual(hash(CronExpression('*/15 * * * *')), hash(CronExpression('0,15,30,45 * * * *')))
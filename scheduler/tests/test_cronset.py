@@ -0,0 +1,90 @@
+import datetime
+import pytz
+import random
+import unittest
+from ..cronset import CronSet
+from ..scheduler import Scheduler
+
+EXPRESSIONS = [
+    '* * * * *', '*/5 * * * *', '0 9 * * 1-5', '30 2 * * *', '0 * * * *',
+    '0 0 L * *', '0 12 13 * 5', '*/7 3 * * 1-5', '15 1,2,3 * * *', '0 0 * * 5#2'
+]
+ZONES = ['UTC', 'Asia/Calcutta', 'America/New_York', 'Europe/London']
+
+
+def cron(expression, timezone='UTC', **kwargs):
+    payload = {
+        'schedule_type': 'cron',
+        'timezone': timezone,
+        'cron': expression
+    }
+    payload.update(kwargs)
+    return payload
+
+
+class TestCronSet(unittest.TestCase):
+
+    def test_due_at(self):
+        cronset = CronSet()
+        cronset.add('every', cron('* * * * *'))
+        cronset.add('five', cron('*/5 * * * *'))
+        cronset.add('ist', cron('30 10 * * *', 'Asia/Calcutta'))
+        self.assertEqual(cronset.due_at(datetime.datetime(2099, 1, 1, 5, 0)), {'every', 'five', 'ist'})
+        self.assertEqual(cronset.due_at(datetime.datetime(2099, 1, 1, 5, 1)), {'every'})
+
+    def test_due_between(self):
+        cronset = CronSet()
+        cronset.add('five', cron('*/5 * * * *'))
+        cronset.add('ten', cron('*/10 * * * *'))
+        due = cronset.due_between(datetime.datetime(2099, 1, 1, 0, 0), datetime.datetime(2099, 1, 1, 0, 10))
+        self.assertEqual(due, [
+            (datetime.datetime(2099, 1, 1, 0, 5, tzinfo=pytz.UTC), {'five'}),
+            (datetime.datetime(2099, 1, 1, 0, 10, tzinfo=pytz.UTC), {'five', 'ten'})
+        ])
+
+    def test_remove_and_bounds(self):
+        cronset = CronSet()
+        cronset.add('a', cron('* * * * *'))
+        cronset.add('b', cron('* * * * *', start_date='01/02/2099'))
+        minute = datetime.datetime(2099, 1, 1, 0, 5)
+        self.assertEqual(cronset.due_at(minute), {'a'})
+        cronset.remove('a')
+        self.assertEqual(cronset.due_at(minute), set())
+        self.assertEqual(cronset.due_at(datetime.datetime(2099, 1, 2, 0, 5)), {'b'})
+        with self.assertRaises(KeyError):
+            cronset.remove('a')
+        with self.assertRaises(ValueError):
+            cronset.add('c', {
+                'schedule_type': 'date_specific',
+                'timezone': 'UTC',
+                'schedules': [{'start_date': '01/20/2099'}]
+            })
+
+    def test_matches_next_eta(self):
+        rand = random.Random(3)
+        scheduler = Scheduler()
+        cronset = CronSet()
+        compiled = {}
+        for index in range(60):
+            payload = cron(rand.choice(EXPRESSIONS), rand.choice(ZONES))
+            compiled[index] = scheduler.compile(schedule_data=payload)
+            cronset.add(index, compiled[index])
+        minutes = [
+            # around the 2024 New York DST changes
+            datetime.datetime(2024, 3, 10, 6, 55, tzinfo=pytz.UTC),
+            datetime.datetime(2024, 11, 3, 4, 55, tzinfo=pytz.UTC),
+            datetime.datetime(2024, 11, 3, 5, 55, tzinfo=pytz.UTC)
+        ]
+        minutes += [
+            datetime.datetime(2024, 1, 1, tzinfo=pytz.UTC) + datetime.timedelta(minutes=rand.randint(0, 525600))
+            for _ in range(20)
+        ]
+        for start in minutes:
+            for step in range(10):
+                minute = start + datetime.timedelta(minutes=step)
+                previous = minute - datetime.timedelta(minutes=1)
+                expected = set(
+                    index for index, schedule in compiled.items()
+                    if schedule.next_eta(from_date=previous) == minute
+                )
+                self.assertEqual(cronset.due_at(minute), expected, minute)
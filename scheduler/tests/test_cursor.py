@@ -0,0 +1,167 @@
+import datetime
+import pytz
+import random
+import unittest
+from ..compiled import CompiledSchedule
+from ..cursor import ScheduleCursor, move_all
+from ..scheduler import Scheduler
+
+START = datetime.datetime(2099, 1, 1, tzinfo=pytz.UTC)
+
+
+class CountingExpression(object):
+    """
+    Cron expression counting its searches
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.calls = 0
+
+    def next_after(self, from_date, tzinfo):
+        self.calls += 1
+        return self.expression.next_after(from_date, tzinfo)
+
+
+def counted(schedule_data):
+    compiled = Scheduler().compile(schedule_data=schedule_data)
+    expression = CountingExpression(compiled.expression)
+    return CompiledSchedule(
+        schedule_type='cron', timezone=compiled.timezone, tzinfo=compiled.tzinfo, start=compiled.start,
+        end=compiled.end, cron=compiled.cron, expression=expression), expression
+
+
+def cron(expression, **fields):
+    schedule_data = {'schedule_type': 'cron', 'timezone': 'America/New_York', 'cron': expression}
+    schedule_data.update(fields)
+    return schedule_data
+
+
+def date_specific(*dates):
+    return {
+        'schedule_type': 'date_specific',
+        'timezone': 'UTC',
+        'schedules': [{'start_date': '01/{:02d}/2099'.format(day), 'start_time': '10:00 AM'} for day in dates]
+    }
+
+
+class TestScheduleCursor(unittest.TestCase):
+
+    def test_initial_eta(self):
+        for schedule_data in (cron('30 2 * * *'), date_specific(2, 5), {
+                'schedule_type': 'recurring', 'timezone': 'UTC', 'frequency': 'weekly',
+                'start_date': '01/01/2099', 'start_time': '09:00 AM'}):
+            cursor = ScheduleCursor(schedule_data, from_date=START)
+            self.assertEqual(cursor.eta, Scheduler().get_next_eta(schedule_data=schedule_data, from_date=START))
+            self.assertEqual(cursor.reference, START)
+
+    def test_move_forward_keeps_valid_eta(self):
+        compiled, expression = counted(cron('30 2 * * *'))
+        cursor = ScheduleCursor(compiled, from_date=START)
+        self.assertEqual(expression.calls, 1)
+        self.assertFalse(cursor.move_to(START + datetime.timedelta(hours=3)))
+        self.assertEqual(expression.calls, 1)
+        self.assertTrue(cursor.move_to(START + datetime.timedelta(hours=8)))
+        self.assertEqual(expression.calls, 2)
+        self.assertEqual(cursor.eta, datetime.datetime(2099, 1, 2, 7, 30, tzinfo=pytz.UTC))
+
+    def test_clock_jump_back(self):
+        compiled, expression = counted(cron('*/10 * * * *', start_date='01/01/2099', start_time='12:00 AM'))
+        cursor = ScheduleCursor(compiled, from_date=START)
+        self.assertEqual(cursor.eta, datetime.datetime(2099, 1, 1, 5, 10, tzinfo=pytz.UTC))
+        # before the start of the schedule either way
+        self.assertFalse(cursor.move_to(START - datetime.timedelta(days=1)))
+        self.assertEqual(expression.calls, 1)
+        cursor.move_to(START + datetime.timedelta(hours=6))
+        self.assertTrue(cursor.move_to(START + datetime.timedelta(hours=5, minutes=30)))
+        self.assertEqual(cursor.eta, datetime.datetime(2099, 1, 1, 5, 40, tzinfo=pytz.UTC))
+
+    def test_end_bound(self):
+        compiled, expression = counted(cron('0 12 * * *'))
+        cursor = ScheduleCursor(compiled, from_date=START)
+        eta = cursor.eta
+        self.assertFalse(cursor.update(end=eta + datetime.timedelta(days=3)))
+        self.assertTrue(cursor.update(end=eta - datetime.timedelta(minutes=1)))
+        self.assertIsNone(cursor.eta)
+        self.assertEqual(expression.calls, 1)
+        self.assertTrue(cursor.update(end=None))
+        self.assertEqual(cursor.eta, eta)
+        self.assertEqual(expression.calls, 2)
+
+    def test_start_bound(self):
+        compiled, expression = counted(cron('0 12 * * *'))
+        cursor = ScheduleCursor(compiled, from_date=START)
+        self.assertFalse(cursor.update(start=START + datetime.timedelta(hours=1)))
+        self.assertEqual(expression.calls, 1)
+        self.assertTrue(cursor.update(start=START + datetime.timedelta(days=3)))
+        self.assertEqual(cursor.eta, datetime.datetime(2099, 1, 4, 17, 0, tzinfo=pytz.UTC))
+        self.assertTrue(cursor.update(start=None))
+        self.assertEqual(cursor.eta, datetime.datetime(2099, 1, 1, 17, 0, tzinfo=pytz.UTC))
+
+    def test_dates(self):
+        cursor = ScheduleCursor(date_specific(5, 9), from_date=START)
+        self.assertEqual(cursor.eta, datetime.datetime(2099, 1, 5, 10, 0, tzinfo=pytz.UTC))
+        self.assertTrue(cursor.update(added=[datetime.datetime(2099, 1, 3, 10, 0)]))
+        self.assertEqual(cursor.eta, datetime.datetime(2099, 1, 3, 10, 0, tzinfo=pytz.UTC))
+        self.assertFalse(cursor.update(
+            added=[datetime.datetime(2099, 1, 7)], removed=[datetime.datetime(2099, 1, 9, 10, 0)]))
+        self.assertTrue(cursor.update(removed=[datetime.datetime(2099, 1, 3, 10, 0)]))
+        self.assertEqual(cursor.eta, datetime.datetime(2099, 1, 5, 10, 0, tzinfo=pytz.UTC))
+        self.assertEqual(len(cursor.schedule.dates), 2)
+
+    def test_new_cron(self):
+        cursor = ScheduleCursor(cron('0 12 * * *'), from_date=START)
+        self.assertFalse(cursor.update(cron='0 12 * * *'))
+        self.assertTrue(cursor.update(cron='15 12 * * *'))
+        self.assertEqual(cursor.eta, datetime.datetime(2099, 1, 1, 17, 15, tzinfo=pytz.UTC))
+        self.assertEqual(cursor.schedule.cron, '15 12 * * *')
+
+    def test_invalid_updates(self):
+        cursor = ScheduleCursor(date_specific(5), from_date=START)
+        with self.assertRaises(ValueError):
+            cursor.update(start=START)
+        with self.assertRaises(ValueError):
+            cursor.update(cron='* * * * *')
+        with self.assertRaises(ValueError):
+            ScheduleCursor(cron('0 12 * * *'), from_date=START).update(added=[START])
+        with self.assertRaises(ValueError):
+            ScheduleCursor(cron('0 12 * * *'), from_date=START).update(end=START - datetime.timedelta(days=1), start=START)
+
+    def test_move_all(self):
+        cursors = [ScheduleCursor(cron('0 {} * * *'.format(hour)), from_date=START) for hour in range(24)]
+        changed = move_all(cursors, START + datetime.timedelta(hours=2))
+        self.assertEqual([cursor.schedule.cron for cursor in changed], ['0 20 * * *', '0 21 * * *'])
+
+    def test_matches_next_eta(self):
+        rand = random.Random(3)
+        for _ in range(20):
+            cursor = ScheduleCursor(cron('{} */{} * * *'.format(rand.randint(0, 59), rand.randint(1, 12))), from_date=START)
+            dated = ScheduleCursor(date_specific(*rand.sample(range(1, 29), 5)), from_date=START)
+            for _ in range(30):
+                reference = START + datetime.timedelta(minutes=rand.randint(-2000, 40000))
+                operation = rand.randint(0, 4)
+                if operation == 0:
+                    cursor.move_to(reference)
+                    dated.move_to(reference)
+                elif operation == 1:
+                    end = rand.choice([None, reference])
+                    start = cursor.schedule.start
+                    if end is not None and start is not None and end < start:
+                        end = start
+                    cursor.update(end=end)
+                elif operation == 2:
+                    start = rand.choice([None, reference])
+                    end = cursor.schedule.end
+                    if start is not None and end is not None and end < start:
+                        start = end
+                    cursor.update(start=start)
+                elif operation == 3:
+                    cursor.update(cron='{} * * * *'.format(rand.randint(0, 59)), from_date=reference)
+                else:
+                    eta = rand.choice([dated.eta, reference])
+                    if eta is not None:
+                        dated.update(
+                            added=[reference] if rand.random() < 0.6 else [],
+                            removed=[eta] if rand.random() < 0.6 else [])
+                for checked in (cursor, dated):
+                    self.assertEqual(checked.eta, checked.schedule.next_eta(from_date=checked.reference))
@@ -141,3 +141,62 @@ class TestDateSpecific(unittest.TestCase):
             ]
         })
         self.assertEqual(eta, expected_datetime)
+
+    def test_scheduler_unsorted_dates(self):
+        scheduler = Scheduler()
+        schedules = [
+            {
+                'start_date': '02/20/2099',
+                'start_time': "12:24 PM"
+            },
+            {
+                'start_date': '01/20/2099',
+                'start_time': "12:24 PM"
+            }
+        ]
+        eta = scheduler.get_next_eta(schedule_data={
+            'schedule_type': 'date_specific',
+            'timezone': 'UTC',
+            'schedules': schedules
+        })
+        self.assertEqual(eta, datetime.datetime(2099, 1, 20, 12, 24, tzinfo=pytz.UTC))
+        self.assertEqual(schedules[0], {'start_date': '02/20/2099', 'start_time': "12:24 PM"})
+
+    def test_scheduler_many_dates(self):
+        scheduler = Scheduler()
+        base = datetime.date(2099, 1, 1)
+        schedules = [
+            {
+                'start_date': (base + datetime.timedelta(days=day)).strftime('%m/%d/%Y'),
+                'start_time': "09:00 AM"
+            } for day in range(2000, 0, -1)
+        ]
+        compiled = scheduler.compile(schedule_data={
+            'schedule_type': 'date_specific',
+            'timezone': 'UTC',
+            'schedules': schedules
+        })
+        self.assertEqual(len(compiled.dates), 2000)
+        self.assertEqual(
+            compiled.next_eta(from_date=datetime.datetime(2100, 6, 1, 9, 0)),
+            datetime.datetime(2100, 6, 2, 9, 0, tzinfo=pytz.UTC))
+
+    def test_scheduler_with_dates(self):
+        scheduler = Scheduler()
+        compiled = scheduler.compile(schedule_data={
+            'schedule_type': 'date_specific',
+            'timezone': 'UTC',
+            'schedules': [
+                {
+                    'start_date': '02/20/2099',
+                    'start_time': "12:24 PM"
+                }
+            ]
+        })
+        added = datetime.datetime(2099, 1, 20, 12, 24, tzinfo=pytz.UTC)
+        updated = compiled.with_dates(added=[added])
+        self.assertEqual(updated.next_eta(from_date=datetime.datetime(2099, 1, 1)), added)
+        self.assertEqual(compiled.next_eta(from_date=datetime.datetime(2099, 1, 1)),
+                         datetime.datetime(2099, 2, 20, 12, 24, tzinfo=pytz.UTC))
+        removed = updated.with_dates(removed=[datetime.datetime(2099, 2, 20, 12, 24)])
+        self.assertEqual(removed.etas, (added,))
@@ -0,0 +1,91 @@
+import asyncio
+import datetime
+import pytz
+import unittest
+from ..dispatcher import AsyncScheduler
+
+
+class ShiftedClockScheduler(AsyncScheduler):
+    """
+    Clock shifted so that the next minute boundary is 0.1s away
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(ShiftedClockScheduler, self).__init__(*args, **kwargs)
+        now = datetime.datetime.now(pytz.UTC)
+        boundary = now.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        self.shift = boundary - now - datetime.timedelta(seconds=0.1)
+
+    def _now(self):
+        return datetime.datetime.now(pytz.UTC) + self.shift
+
+
+def every_minute():
+    return {
+        'schedule_type': 'cron',
+        'timezone': 'UTC',
+        'cron': '* * * * *'
+    }
+
+
+class TestAsyncScheduler(unittest.TestCase):
+
+    def test_fires_callback_at_eta(self):
+        fired = []
+        lateness = []
+
+        async def callback(schedule_id, eta):
+            fired.append((schedule_id, eta))
+            runner.stop()
+
+        async def main():
+            runner.add('job', every_minute(), callback)
+            await asyncio.wait_for(runner.run(), 5)
+
+        runner = ShiftedClockScheduler(on_lateness=lambda *args: lateness.append(args[2]))
+        asyncio.run(main())
+        self.assertEqual(len(fired), 1)
+        self.assertEqual(fired[0][0], 'job')
+        self.assertGreaterEqual(lateness[0], 0)
+        self.assertLess(lateness[0], 1)
+
+    def test_wakes_up_when_schedule_added(self):
+        fired = []
+
+        async def callback(schedule_id, eta):
+            fired.append(schedule_id)
+            runner.stop()
+
+        async def main():
+            task = asyncio.ensure_future(runner.run())
+            await asyncio.sleep(0.05)
+            runner.add('late', every_minute(), callback)
+            await asyncio.wait_for(task, 5)
+
+        runner = ShiftedClockScheduler()
+        asyncio.run(main())
+        self.assertEqual(fired, ['late'])
+
+    def test_remove_drops_lateness(self):
+        fired = []
+
+        async def callback(schedule_id, eta):
+            fired.append(schedule_id)
+            if schedule_id == 'job':
+                runner.remove(schedule_id)
+                runner.stop()
+
+        async def main():
+            runner.add('job', every_minute(), callback)
+            await asyncio.wait_for(runner.run(), 5)
+            # a fire already scheduled when its id is removed isn't tracked
+            await runner._fire('gone', runner._now(), callback)
+
+        runner = ShiftedClockScheduler()
+        asyncio.run(main())
+        self.assertEqual(fired, ['job', 'gone'])
+        self.assertEqual(runner.lateness, {})
+
+    def test_invalid_concurrency(self):
+        with self.assertRaises(ValueError):
+            AsyncScheduler(concurrency=0)
@@ -0,0 +1,98 @@
+import datetime
+import pytz
+import random
+import unittest
+from ..freebusy import FreeBusy
+from ..utils import epoch_minutes, from_epoch_minutes
+
+START = datetime.datetime(2099, 1, 1, tzinfo=pytz.UTC)
+END = datetime.datetime(2099, 1, 3, tzinfo=pytz.UTC)
+
+
+def utc(*args):
+    return datetime.datetime(*args, tzinfo=pytz.UTC)
+
+
+def cron(expression, timezone='UTC'):
+    return {'schedule_type': 'cron', 'timezone': timezone, 'cron': expression}
+
+
+class TestFreeBusy(unittest.TestCase):
+
+    def test_busy_and_free(self):
+        freebusy = FreeBusy({
+            'standup': cron('0 9 * * *'),
+            'review': cron('15 9 * * *'),
+            'lunch': cron('0 12 * * *'),
+        }, duration=30)
+        day = (utc(2099, 1, 1), utc(2099, 1, 2))
+        self.assertEqual(freebusy.busy(*day), [
+            (utc(2099, 1, 1, 9), utc(2099, 1, 1, 9, 45)),
+            (utc(2099, 1, 1, 12), utc(2099, 1, 1, 12, 30)),
+        ])
+        self.assertEqual(freebusy.free(*day, min_duration=180), [
+            (utc(2099, 1, 1), utc(2099, 1, 1, 9)),
+            (utc(2099, 1, 1, 12, 30), utc(2099, 1, 2)),
+        ])
+        self.assertEqual(freebusy.conflicts(*day), [
+            ('standup', 'review', utc(2099, 1, 1, 9, 15), utc(2099, 1, 1, 9, 30)),
+        ])
+
+    def test_occurrence_before_window_is_clipped(self):
+        freebusy = FreeBusy([('late', cron('30 23 * * *'))], duration=datetime.timedelta(hours=1))
+        self.assertEqual(
+            freebusy.busy(utc(2099, 1, 2), utc(2099, 1, 2, 1)),
+            [(utc(2099, 1, 2), utc(2099, 1, 2, 0, 30))])
+
+    def test_date_specific(self):
+        freebusy = FreeBusy({
+            'once': {
+                'schedule_type': 'date_specific',
+                'timezone': 'UTC',
+                'schedules': [{'start_date': '01/01/2099', 'start_time': '10:00 AM'}]
+            },
+            'daily': cron('0 10 * * *'),
+        }, duration=60)
+        self.assertEqual(
+            [conflict[:2] for conflict in freebusy.conflicts(START, END)], [('once', 'daily')])
+
+    def test_matches_brute_force(self):
+        rand = random.Random(3)
+        schedules = dict(
+            (index, cron('{} {} * * *'.format(rand.choice(['*/20', '5', '10,40']), rand.choice(['*', '*/3', '9-17']))))
+            for index in range(8))
+        duration = 25
+        freebusy = FreeBusy(schedules, duration)
+        start, end = epoch_minutes(START), epoch_minutes(END)
+        occupied = {}
+        for schedule_id, payload in schedules.items():
+            compiled = freebusy._schedules[schedule_id][1]
+            for eta in compiled.iter_etas(start=from_epoch_minutes(start - duration), until=END):
+                for minute in range(epoch_minutes(eta), epoch_minutes(eta) + duration):
+                    if start <= minute < end:
+                        occupied.setdefault(minute, set()).add(schedule_id)
+        busy_minutes = set()
+        for busy_start, busy_end in freebusy.busy(START, END):
+            busy_minutes.update(range(epoch_minutes(busy_start), epoch_minutes(busy_end)))
+        self.assertEqual(busy_minutes, set(occupied))
+        free_minutes = set()
+        for free_start, free_end in freebusy.free(START, END):
+            free_minutes.update(range(epoch_minutes(free_start), epoch_minutes(free_end)))
+        self.assertEqual(free_minutes, set(range(start, end)) - set(occupied))
+        pairs = set()
+        for first, second, overlap_start, overlap_end in freebusy.conflicts(START, END):
+            self.assertLess(overlap_start, overlap_end)
+            pairs.add(frozenset((first, second)))
+        expected = set()
+        for ids in occupied.values():
+            for first in ids:
+                for second in ids:
+                    if first != second:
+                        expected.add(frozenset((first, second)))
+        self.assertEqual(pairs, expected)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            FreeBusy({}, duration=0)
+        with self.assertRaises(ValueError):
+            FreeBusy({}, duration=10).busy(END, START)
@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# cold `import scheduler` may take at most this share of `import pytz, croniter`
+# (measured ~0.3), timed in the same run so a slow machine slows both
+IMPORT_RATIO = 0.5
+# and never more than this many seconds (measured ~15ms)
+IMPORT_BUDGET = 0.25
+
+HEAVY_MODULES = ['pytz', 'croniter', 'dateutil', 'multiprocessing', 'concurrent.futures', 'scheduler.enums']
+
+ONE_ETA = '''
+import datetime, json, sys
+import scheduler
+eta = scheduler.Scheduler().get_next_eta(schedule_data={
+    'schedule_type': 'cron', 'timezone': 'America/New_York', 'cron': '30 2 * * *'},
+    from_date=datetime.datetime(2099, 1, 1))
+print(json.dumps({'eta': eta.isoformat(), 'modules': sorted(sys.modules)}))
+'''
+
+WITHOUT_PYTZ = '''
+import datetime, sys
+sys.modules['pytz'] = None  # not installed
+from scheduler import tz
+try:
+    tz.get_table('America/New_York').localize(datetime.datetime(2024, 3, 10, 2, 30), is_dst=None)
+except tz.NonExistentTimeError as error:
+    print(type(error).__mro__[1].__name__)
+'''
+
+
+def _run(args, backend='pytz'):
+    env = dict(os.environ, SCHEDULER_TZ_BACKEND=backend)
+    return subprocess.run(
+        [sys.executable] + args, cwd=ROOT, env=env, check=True,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+
+def _import_time(modules):
+    """
+    Which returns the cumulative seconds `-X importtime` reports for
+    a cold import of `modules`
+    """
+    elapsed = {}
+    for line in _run(['-X', 'importtime', '-c', 'import ' + ', '.join(modules)]).stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() in modules:
+            elapsed[fields[2].strip()] = int(fields[1]) / 1e6
+    if len(elapsed) != len(modules):
+        raise AssertionError("{} missing from the import times".format(', '.join(set(modules) - set(elapsed))))
+    return sum(elapsed.values())
+
+
+class TestImport(unittest.TestCase):
+
+    def test_lazy_modules(self):
+        modules = _run(['-c', 'import sys, scheduler; print(" ".join(sys.modules))']).stdout.split()
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_import_budget(self):
+        # best of five, interleaved so both pay for the same machine load
+        runs = [(_import_time(['scheduler']), _import_time(['pytz', 'croniter'])) for _ in range(5)]
+        elapsed = min(run[0] for run in runs)
+        heavy = min(run[1] for run in runs)
+        self.assertLess(elapsed, IMPORT_BUDGET)
+        self.assertLess(elapsed, heavy * IMPORT_RATIO)
+
+    def test_one_eta(self):
+        result = json.loads(_run(['-c', ONE_ETA]).stdout)
+        self.assertEqual(result['eta'], '2099-01-01T07:30:00+00:00')
+        self.assertIn('pytz', result['modules'])
+        self.assertNotIn('croniter', result['modules'])
+
+    def test_one_eta_zoneinfo(self):
+        result = json.loads(_run(['-c', ONE_ETA], backend='zoneinfo').stdout)
+        self.assertEqual(result['eta'], '2099-01-01T07:30:00+00:00')
+        self.assertNotIn('pytz', result['modules'])
+        self.assertNotIn('croniter', result['modules'])
+
+    def test_zoneinfo_without_pytz(self):
+        self.assertEqual(_run(['-c', WITHOUT_PYTZ], backend='zoneinfo').stdout.strip(), 'ValueError')
@@ -0,0 +1,95 @@
+import datetime
+import pytz
+import unittest
+from ..cache import EtaCache
+from ..instrumentation import Collector, active, collect
+from ..scheduler import Scheduler
+
+FROM_DATE = datetime.datetime(2099, 1, 1, tzinfo=pytz.UTC)
+
+CRON = {
+    'schedule_type': 'cron',
+    'timezone': 'Asia/Calcutta',
+    'start_date': '01/01/2099',
+    'start_time': '10:00 AM',
+    'cron': '30 10 * * *'
+}
+
+DATE_SPECIFIC = {
+    'schedule_type': 'date_specific',
+    'timezone': 'UTC',
+    'schedules': [
+        {'start_date': '01/20/2099', 'start_time': '12:24 PM'},
+        {'start_date': '01/10/2099', 'start_time': '09:00 AM'},
+    ]
+}
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_disabled(self):
+        self.assertIsNone(active())
+        Scheduler().get_next_eta(schedule_data=CRON, from_date=FROM_DATE)
+        self.assertIsNone(active())
+
+    def test_scheduler_collector(self):
+        collector = Collector()
+        scheduler = Scheduler(collector=collector)
+        scheduler.get_next_eta(schedule_data=CRON, from_date=FROM_DATE)
+        scheduler.get_next_eta(schedule_data=DATE_SPECIFIC, from_date=FROM_DATE)
+        data = collector.as_dict()
+        self.assertEqual(data['stages']['get_next_eta']['count'], 2)
+        self.assertEqual(data['stages']['compile']['count'], 2)
+        # cron start_date & two dates
+        self.assertEqual(data['stages']['parse']['count'], 3)
+        self.assertEqual(data['stages']['localize']['count'], 3)
+        self.assertEqual(data['stages']['next_eta_cron']['count'], 1)
+        self.assertEqual(data['stages']['next_eta_date_specific']['count'], 1)
+        self.assertEqual(data['counters']['schedules_scanned'], 2)
+        self.assertEqual(data['counters']['dates_searched'], 2)
+        self.assertGreaterEqual(data['counters']['cron_iterations'], 1)
+        self.assertIsNone(active())
+
+    def test_dates_searched(self):
+        schedule_data = dict(DATE_SPECIFIC, schedules=[
+            {'start_date': '01/{:02d}/2099'.format(day), 'start_time': '09:00 AM'} for day in range(1, 31)])
+        collector = Collector()
+        Scheduler(collector=collector).get_next_eta(schedule_data=schedule_data, from_date=FROM_DATE)
+        # 30 dates, 5 probes
+        self.assertEqual(collector.as_dict()['counters']['dates_searched'], 5)
+
+    def test_context_collector_and_cache(self):
+        scheduler = Scheduler(cache=EtaCache())
+        with collect() as collector:
+            for _ in range(3):
+                scheduler.get_next_eta(schedule_data=CRON, from_date=FROM_DATE)
+        scheduler.get_next_eta(schedule_data=CRON, from_date=FROM_DATE)
+        counters = collector.as_dict()['counters']
+        self.assertEqual((counters['cache_misses'], counters['cache_hits']), (1, 2))
+
+    def test_errors_are_timed(self):
+        collector = Collector()
+        with self.assertRaises(ValueError):
+            Scheduler(collector=collector).get_next_eta(
+                schedule_data=dict(CRON, cron='* x u s'), from_date=FROM_DATE)
+        self.assertEqual(collector.as_dict()['stages']['get_next_eta']['count'], 1)
+        self.assertIsNone(active())
+
+    def test_sampling(self):
+        collector = Collector(sample_rate=0)
+        scheduler = Scheduler(collector=collector)
+        for _ in range(5):
+            scheduler.get_next_eta(schedule_data=CRON, from_date=FROM_DATE)
+        self.assertEqual(collector.as_dict(), {'stages': {}, 'counters': {}})
+        with self.assertRaises(ValueError):
+            Collector(sample_rate=2)
+
+    def test_prometheus(self):
+        collector = Collector()
+        Scheduler(collector=collector).get_next_eta(schedule_data=CRON, from_date=FROM_DATE)
+        text = collector.to_prometheus()
+        self.assertIn('# TYPE scheduler_stage_seconds summary', text)
+        self.assertIn('scheduler_stage_seconds_count{stage="get_next_eta"} 1', text)
+        self.assertIn('scheduler_schedules_scanned_total 1', text)
+        collector.reset()
+        self.assertEqual(collector.as_dict(), {'stages': {}, 'counters': {}})
@@ -0,0 +1,87 @@
+import datetime
+import pytz
+import unittest
+from ..scheduler import Scheduler
+
+
+class TestIterEtas(unittest.TestCase):
+
+    def test_iter_etas_cron_limit(self):
+        scheduler = Scheduler()
+        etas = list(scheduler.iter_etas(schedule_data={
+            'schedule_type': 'cron',
+            'timezone': 'UTC',
+            'cron': '0 9 * * *'
+        }, start=datetime.datetime(2099, 1, 1), limit=3))
+        self.assertEqual(etas, [
+            datetime.datetime(2099, 1, 1, 9, 0, tzinfo=pytz.UTC),
+            datetime.datetime(2099, 1, 2, 9, 0, tzinfo=pytz.UTC),
+            datetime.datetime(2099, 1, 3, 9, 0, tzinfo=pytz.UTC)
+        ])
+
+    def test_iter_etas_cron_until_and_end_date(self):
+        scheduler = Scheduler()
+        payload = {
+            'schedule_type': 'cron',
+            'timezone': 'Asia/Calcutta',
+            'cron': '30 10 * * *',
+            'start_date': '01/01/2099',
+            'end_date': '01/05/2099',
+            'end_time': '10:30 AM'
+        }
+        etas = list(scheduler.iter_etas(schedule_data=payload, start=datetime.datetime(2098, 1, 1)))
+        self.assertEqual(len(etas), 5)
+        self.assertEqual(etas[-1], datetime.datetime(2099, 1, 5, 5, 0, tzinfo=pytz.UTC))
+        etas = list(scheduler.iter_etas(
+            schedule_data=payload, start=datetime.datetime(2098, 1, 1), until=datetime.datetime(2099, 1, 3, 5, 0)))
+        self.assertEqual(len(etas), 3)
+
+    def test_iter_etas_cron_unbounded(self):
+        scheduler = Scheduler()
+        iterator = scheduler.iter_etas(schedule_data={
+            'schedule_type': 'cron',
+            'timezone': 'UTC',
+            'cron': '* * * * *'
+        }, start=datetime.datetime(2099, 1, 1))
+        for _ in range(1000):
+            eta = next(iterator)
+        self.assertEqual(eta, datetime.datetime(2099, 1, 1, 16, 40, tzinfo=pytz.UTC))
+
+    def test_iter_etas_date_specific(self):
+        scheduler = Scheduler()
+        etas = list(scheduler.iter_etas(schedule_data={
+            'schedule_type': 'date_specific',
+            'timezone': 'UTC',
+            'schedules': [
+                {
+                    'start_date': '02/20/2099',
+                    'start_time': "12:24 PM"
+                },
+                {
+                    'start_date': '01/20/2099',
+                    'start_time': "12:24 PM"
+                },
+                {
+                    'start_date': '01/20/2019',
+                    'start_time': "12:24 PM"
+                }
+            ]
+        }, start=datetime.datetime(2020, 1, 1)))
+        self.assertEqual(etas, [
+            datetime.datetime(2099, 1, 20, 12, 24, tzinfo=pytz.UTC),
+            datetime.datetime(2099, 2, 20, 12, 24, tzinfo=pytz.UTC)
+        ])
+
+    def test_get_next_eta_date_specific_from_date(self):
+        scheduler = Scheduler()
+        eta = scheduler.get_next_eta(schedule_data={
+            'schedule_type': 'date_specific',
+            'timezone': 'UTC',
+            'schedules': [
+                {
+                    'start_date': '01/20/2019',
+                    'start_time': "12:24 PM"
+                }
+            ]
+        }, from_date=datetime.datetime(2019, 1, 1))
+        self.assertEqual(eta, datetime.datetime(2019, 1, 20, 12, 24, tzinfo=pytz.UTC))
@@ -0,0 +1,117 @@
+import datetime
+import pytz
+import unittest
+from ..scheduler import Scheduler
+
+FROM_DATE = datetime.datetime(2099, 1, 1, tzinfo=pytz.UTC)
+
+
+def utc(*args):
+    return datetime.datetime(*args, tzinfo=pytz.UTC)
+
+
+class TestRecurring(unittest.TestCase):
+
+    def payload(self, **kwargs):
+        payload = {
+            'schedule_type': 'recurring',
+            'timezone': 'UTC',
+            'start_date': '01/05/2099',
+            'start_time': '10:30 AM',
+        }
+        payload.update(kwargs)
+        return payload
+
+    def etas(self, payload, start=FROM_DATE, limit=5):
+        return list(Scheduler().iter_etas(schedule_data=payload, start=start, limit=limit))
+
+    def test_anchor_is_first_occurrence(self):
+        eta = Scheduler().get_next_eta(schedule_data=self.payload(frequency='daily'), from_date=FROM_DATE)
+        self.assertEqual(eta, utc(2099, 1, 5, 10, 30))
+
+    def test_every_45_minutes(self):
+        payload = self.payload(frequency='minutely', interval=45)
+        eta = Scheduler().get_next_eta(schedule_data=payload, from_date=utc(2099, 3, 1, 0, 0))
+        # 55 days and 13h30m after the anchor, 45 minutes divide 80010 minutes
+        self.assertEqual(eta, utc(2099, 3, 1, 0, 0) + datetime.timedelta(minutes=45 - 80010 % 45))
+        self.assertEqual((eta - utc(2099, 1, 5, 10, 30)).total_seconds() % (45 * 60), 0)
+
+    def test_every_3_weeks_on_tuesday_and_thursday(self):
+        # 01/05/2099 is a Monday
+        payload = self.payload(frequency='weekly', interval=3, by_weekday=['TU', 'TH'])
+        self.assertEqual(self.etas(payload), [
+            utc(2099, 1, 6, 10, 30), utc(2099, 1, 8, 10, 30),
+            utc(2099, 1, 27, 10, 30), utc(2099, 1, 29, 10, 30),
+            utc(2099, 2, 17, 10, 30),
+        ])
+
+    def test_monthly_skips_missing_days(self):
+        payload = self.payload(frequency='monthly', start_date='01/31/2099')
+        self.assertEqual(self.etas(payload, limit=3), [
+            utc(2099, 1, 31, 10, 30), utc(2099, 3, 31, 10, 30), utc(2099, 5, 31, 10, 30)])
+
+    def test_monthly_last_day(self):
+        payload = self.payload(frequency='monthly', by_monthday=[-1])
+        self.assertEqual(self.etas(payload, limit=3), [
+            utc(2099, 1, 31, 10, 30), utc(2099, 2, 28, 10, 30), utc(2099, 3, 31, 10, 30)])
+
+    def test_count(self):
+        payload = self.payload(frequency='daily', interval=2, count=3)
+        self.assertEqual(self.etas(payload), [
+            utc(2099, 1, 5, 10, 30), utc(2099, 1, 7, 10, 30), utc(2099, 1, 9, 10, 30)])
+        payload = self.payload(frequency='monthly', by_monthday=[31], count=2)
+        self.assertEqual(self.etas(payload), [utc(2099, 1, 31, 10, 30), utc(2099, 3, 31, 10, 30)])
+
+    def test_count_matches_iteration(self):
+        for fields in (
+                {'frequency': 'daily', 'interval': 3, 'by_weekday': ['MO', 'WE']},
+                {'frequency': 'daily', 'interval': 2, 'by_monthday': [1, -1]},
+                {'frequency': 'weekly', 'interval': 2, 'by_monthday': [13, 20]},
+                {'frequency': 'monthly', 'interval': 5, 'by_weekday': ['FR'], 'by_monthday': [13]},
+                {'frequency': 'monthly', 'start_date': '01/31/2099'},
+                {'frequency': 'yearly', 'interval': 3, 'by_monthday': [29], 'by_weekday': ['SU']},
+                {'frequency': 'yearly', 'start_date': '02/29/2096'},
+                {'frequency': 'hourly', 'interval': 5, 'by_weekday': ['SA', 'SU']}):
+            payload = self.payload(timezone='America/New_York', **fields)
+            etas = self.etas(payload, start=utc(2090, 1, 1), limit=400)
+            for count in (1, 57, 400):
+                counted = self.etas(dict(payload, count=count), start=utc(2090, 1, 1), limit=401)
+                self.assertEqual(counted, etas[:count], (fields, count))
+
+    def test_until_and_end(self):
+        payload = self.payload(frequency='daily', until='01/07/2099')
+        self.assertEqual(len(self.etas(payload)), 3)
+        payload = self.payload(frequency='daily', end_date='01/07/2099', end_time='10:00 AM')
+        self.assertEqual(len(self.etas(payload)), 2)
+        self.assertIsNone(Scheduler().get_next_eta(schedule_data=payload, from_date=utc(2099, 1, 8)))
+
+    def test_wall_clock_kept_across_dst(self):
+        payload = self.payload(
+            frequency='weekly', timezone='America/New_York', start_date='02/24/2030', start_time='09:00 AM')
+        etas = self.etas(payload, start=utc(2030, 1, 1), limit=3)
+        self.assertEqual([eta.hour for eta in etas], [14, 14, 13])
+
+    def test_compiled_equality(self):
+        scheduler = Scheduler()
+        first = scheduler.compile(schedule_data=self.payload(frequency='weekly', by_weekday=['tue', 'thu']))
+        second = scheduler.compile(schedule_data=self.payload(frequency='weekly', by_weekday=['TH', 'TU']))
+        third = scheduler.compile(schedule_data=self.payload(frequency='weekly', by_weekday=['TU']))
+        self.assertEqual(first, second)
+        self.assertEqual(hash(first), hash(second))
+        self.assertNotEqual(first, third)
+
+    def test_invalid(self):
+        scheduler = Scheduler()
+        for payload in (
+                self.payload(frequency='fortnightly'),
+                self.payload(frequency='daily', interval=0),
+                self.payload(frequency='daily', count=0),
+                self.payload(frequency='weekly', by_weekday=['XX']),
+                self.payload(frequency='monthly', by_monthday=[32]),
+                self.payload(frequency='daily', start_date=None),
+                self.payload(frequency='daily', timezone=None),
+                self.payload(frequency='daily', end_date='01/01/2099')):
+            with self.assertRaises(ValueError):
+                scheduler.compile(schedule_data=payload)
+        with self.assertRaises(TypeError):
+            scheduler.compile(schedule_data=self.payload(frequency='weekly', by_weekday='TU'))
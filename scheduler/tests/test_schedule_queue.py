@@ -0,0 +1,70 @@
+import datetime
+import pytz
+import unittest
+from ..schedule_queue import ScheduleQueue
+
+START = datetime.datetime(2099, 1, 1, tzinfo=pytz.UTC)
+
+
+def cron(expression):
+    return {
+        'schedule_type': 'cron',
+        'timezone': 'UTC',
+        'cron': expression
+    }
+
+
+class TestScheduleQueue(unittest.TestCase):
+
+    def test_peek_next(self):
+        queue = ScheduleQueue()
+        queue.add('hourly', cron('0 * * * *'), from_date=START)
+        queue.add('quarterly', cron('*/15 * * * *'), from_date=START)
+        self.assertEqual(len(queue), 2)
+        self.assertEqual(queue.peek_next(), ('quarterly', datetime.datetime(2099, 1, 1, 0, 15, tzinfo=pytz.UTC)))
+
+    def test_pop_due_reschedules(self):
+        queue = ScheduleQueue()
+        queue.add('hourly', cron('0 * * * *'), from_date=START)
+        queue.add('quarterly', cron('*/15 * * * *'), from_date=START)
+        self.assertEqual(queue.pop_due(now=START), [])
+        due = queue.pop_due(now=datetime.datetime(2099, 1, 1, 1, 0))
+        self.assertEqual(due, [
+            ('quarterly', datetime.datetime(2099, 1, 1, 0, 15, tzinfo=pytz.UTC)),
+            ('hourly', datetime.datetime(2099, 1, 1, 1, 0, tzinfo=pytz.UTC))
+        ])
+        self.assertEqual(queue.peek_next(), ('quarterly', datetime.datetime(2099, 1, 1, 1, 15, tzinfo=pytz.UTC)))
+
+    def test_remove_and_update(self):
+        queue = ScheduleQueue()
+        queue.add('a', cron('*/5 * * * *'), from_date=START)
+        queue.add('b', cron('0 * * * *'), from_date=START)
+        with self.assertRaises(ValueError):
+            queue.add('a', cron('* * * * *'))
+        queue.remove('a')
+        self.assertNotIn('a', queue)
+        self.assertEqual(queue.peek_next()[0], 'b')
+        queue.update('b', cron('30 0 * * *'), from_date=START)
+        self.assertEqual(queue.peek_next(), ('b', datetime.datetime(2099, 1, 1, 0, 30, tzinfo=pytz.UTC)))
+        with self.assertRaises(KeyError):
+            queue.remove('a')
+
+    def test_exhausted_schedule_leaves_heap(self):
+        queue = ScheduleQueue()
+        queue.add('once', {
+            'schedule_type': 'date_specific',
+            'timezone': 'UTC',
+            'schedules': [{'start_date': '01/01/2099', 'start_time': '10:00 AM'}]
+        }, from_date=START)
+        self.assertEqual(len(queue.pop_due(now=datetime.datetime(2099, 1, 2))), 1)
+        self.assertIsNone(queue.peek_next())
+        self.assertIn('once', queue)
+
+    def test_lazy_deletion_compacts(self):
+        queue = ScheduleQueue()
+        for index in range(100):
+            queue.add(index, cron('*/5 * * * *'), from_date=START)
+        for index in range(90):
+            queue.remove(index)
+        self.assertLessEqual(len(queue._heap), 20)
+        self.assertEqual(len(queue.pop_due(now=datetime.datetime(2099, 1, 1, 0, 5))), 10)
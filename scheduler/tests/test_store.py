@@ -0,0 +1,143 @@
+import datetime
+import os
+import pytz
+import shutil
+import tempfile
+import unittest
+from ..cron import CronExpression, compile_cron
+from ..scheduler import Scheduler
+from ..store import ScheduleStore
+
+FROM_DATE = datetime.datetime(2099, 1, 1, tzinfo=pytz.UTC)
+
+PAYLOADS = [
+    {
+        'schedule_type': 'cron',
+        'timezone': 'Asia/Calcutta',
+        'cron': '30 10 * * *'
+    },
+    {
+        'schedule_type': 'cron',
+        'timezone': 'America/New_York',
+        'start_date': '03/01/2099',
+        'end_date': '03/10/2099',
+        'end_time': '09:00 AM',
+        'cron': '0 9 * * 1-5'
+    },
+    {
+        'schedule_type': 'cron',
+        'timezone': 'UTC',
+        'cron': '0 12 * * 5#2'
+    },
+    {
+        'schedule_type': 'date_specific',
+        'timezone': 'UTC',
+        'schedules': [
+            {'start_date': '01/20/2099', 'start_time': '12:24 PM'},
+            {'start_date': '01/10/2099', 'start_time': '09:00 AM'},
+        ]
+    },
+    {
+        'schedule_type': 'recurring',
+        'timezone': 'Europe/London',
+        'start_date': '01/05/2099',
+        'start_time': '10:30 AM',
+        'frequency': 'monthly',
+        'by_monthday': [1, -1],
+        'count': 5
+    },
+    {
+        'schedule_type': 'date_specific',
+        'timezone': 'UTC',
+        'schedules': [{'start_date': '02/01/2099', 'start_time': '01:00 AM'}]
+    },
+]
+
+
+class TestScheduleStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'schedules.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def build(self):
+        store = ScheduleStore()
+        for payload in PAYLOADS:
+            store.add(payload)
+        return store
+
+    def assert_same(self, store):
+        scheduler = Scheduler()
+        self.assertEqual(len(store), len(PAYLOADS))
+        for index, payload in enumerate(PAYLOADS):
+            compiled = scheduler.compile(schedule_data=payload)
+            self.assertEqual(store.get(index), compiled)
+            reference = FROM_DATE
+            for _ in range(6):
+                eta = store.next_eta(index, from_date=reference)
+                self.assertEqual(eta, compiled.next_eta(from_date=reference))
+                if eta is None:
+                    break
+                reference = eta
+
+    def test_in_memory(self):
+        self.assert_same(self.build())
+
+    def test_round_trip(self):
+        self.build().save(self.path)
+        for use_mmap in (True, False):
+            store = ScheduleStore.load(self.path, use_mmap=use_mmap)
+            self.assert_same(store)
+            store.close()
+
+    def test_add_after_load(self):
+        store = ScheduleStore()
+        for payload in PAYLOADS[:3]:
+            store.add(payload)
+        store.save(self.path)
+        store = ScheduleStore.load(self.path)
+        for payload in PAYLOADS[3:]:
+            store.add(payload)
+        self.assert_same(store)
+        # interned tables are reused after loading
+        self.assertEqual(store.add(PAYLOADS[0]), len(PAYLOADS))
+        self.assertEqual(len(store._crons), 3)
+
+    def test_cron_from_masks(self):
+        store = self.build()
+        store.add({'schedule_type': 'cron', 'timezone': 'UTC', 'cron': '0 0 L 2 *'})
+        store.save(self.path)
+        loaded = ScheduleStore.load(self.path)
+        for index, cron in ((0, '30 10 * * *'), (1, '0 9 * * 1-5'), (len(PAYLOADS), '0 0 L 2 *')):
+            expression = loaded.get(index).expression
+            # rebuilt from the stored masks, not parsed again
+            self.assertIsNot(expression, compile_cron(cron))
+            self.assertEqual(expression, CronExpression(cron))
+            self.assertEqual(
+                expression.next_after(FROM_DATE, pytz.UTC), CronExpression(cron).next_after(FROM_DATE, pytz.UTC))
+        self.assertNotIsInstance(loaded.get(2).expression, CronExpression)
+        loaded.close()
+
+    def test_interning(self):
+        store = ScheduleStore()
+        for _ in range(3):
+            store.add(PAYLOADS[0])
+            store.add(PAYLOADS[4])
+        self.assertEqual(len(store._crons), 1)
+        self.assertEqual(len(store._columns['rule_frequency']), 1)
+        self.assertEqual(len(store._timezones), 2)
+
+    def test_invalid_file(self):
+        with open(self.path, 'wb') as handle:
+            handle.write(b'not a store file')
+        with self.assertRaises(ValueError):
+            ScheduleStore.load(self.path)
+        self.build().save(self.path)
+        with open(self.path, 'r+b') as handle:
+            handle.seek(8)
+            handle.write(b'\x63\x00\x00\x00')
+        with self.assertRaises(ValueError):
+            ScheduleStore.load(self.path)
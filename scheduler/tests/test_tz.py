@@ -0,0 +1,123 @@
+import datetime
+import pytz
+import random
+import unittest
+from ..enums import TIMEZONES, TIMEZONE_SET
+from ..scheduler import Scheduler
+from ..tz import (
+    AmbiguousTimeError, NonExistentTimeError, TransitionTable, _probed_periods, _tzif_data, _tzif_periods, get_backend, get_table, get_tzinfo, set_backend)
+
+ZONES = ['UTC', 'Asia/Calcutta', 'America/New_York', 'Europe/London', 'Australia/Lord_Howe', 'America/Santiago']
+
+
+class TestTransitionTable(unittest.TestCase):
+
+    def test_localize_matches_pytz(self):
+        rand = random.Random(7)
+        for zone in ZONES:
+            tz = pytz.timezone(zone)
+            table = get_table(zone)
+            for _ in range(300):
+                value = datetime.datetime(1950, 1, 1) + datetime.timedelta(
+                    minutes=rand.randint(0, 85 * 525600))
+                for is_dst in (False, True):
+                    self.assertEqual(
+                        table.localize(value, is_dst=is_dst),
+                        tz.localize(value, is_dst=is_dst).astimezone(pytz.UTC), (zone, value, is_dst))
+                utc = pytz.UTC.localize(value)
+                self.assertEqual(table.to_local(utc), utc.astimezone(tz).replace(tzinfo=None))
+
+    def test_nonexistent_time(self):
+        table = get_table('America/New_York')
+        value = datetime.datetime(2024, 3, 10, 2, 30)
+        with self.assertRaises(NonExistentTimeError):
+            table.localize(value, is_dst=None)
+        self.assertEqual(table.localize(value), datetime.datetime(2024, 3, 10, 7, 30, tzinfo=pytz.UTC))
+        self.assertEqual(table.localize(value, is_dst=True), datetime.datetime(2024, 3, 10, 6, 30, tzinfo=pytz.UTC))
+
+    def test_ambiguous_time(self):
+        table = get_table('America/New_York')
+        value = datetime.datetime(2024, 11, 3, 1, 30)
+        with self.assertRaises(AmbiguousTimeError):
+            table.localize(value, is_dst=None)
+        self.assertEqual(table.localize(value), datetime.datetime(2024, 11, 3, 6, 30, tzinfo=pytz.UTC))
+        self.assertEqual(table.localize(value, is_dst=True), datetime.datetime(2024, 11, 3, 5, 30, tzinfo=pytz.UTC))
+
+    def test_pytz_exceptions(self):
+        self.assertTrue(issubclass(NonExistentTimeError, pytz.exceptions.NonExistentTimeError))
+        self.assertTrue(issubclass(AmbiguousTimeError, pytz.exceptions.AmbiguousTimeError))
+        with self.assertRaises(pytz.exceptions.AmbiguousTimeError):
+            get_table('America/New_York').localize(datetime.datetime(2024, 11, 3, 1, 30), is_dst=None)
+
+    def test_year_range(self):
+        tz = pytz.timezone('America/New_York')
+        table = TransitionTable(tz, 2020, 2021)
+        self.assertLess(len(table), 6)
+        self.assertEqual(
+            table.localize(datetime.datetime(2020, 7, 1)),
+            tz.localize(datetime.datetime(2020, 7, 1)).astimezone(pytz.UTC))
+
+    def test_timezone_set(self):
+        self.assertEqual(TIMEZONE_SET, frozenset(TIMEZONES))
+        self.assertIn('Asia/Calcutta', TIMEZONE_SET)
+
+
+class TestZoneinfoBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = get_backend()
+        set_backend('zoneinfo')
+
+    def tearDown(self):
+        set_backend(self.backend)
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            set_backend('dateutil')
+
+    def test_tzinfo(self):
+        self.assertEqual(type(get_tzinfo('America/New_York')).__module__, 'zoneinfo')
+        self.assertEqual(get_table('America/New_York').name, 'America/New_York')
+
+    def test_matches_pytz(self):
+        rand = random.Random(11)
+        for zone in ZONES:
+            table = get_table(zone)
+            reference = TransitionTable(pytz.timezone(zone))
+            for _ in range(300):
+                # tzdata versions of pytz & the system may differ on recent changes
+                seconds = rand.randint(315532800, 1735689600)
+                self.assertEqual(table.utcoffset(seconds), reference.utcoffset(seconds), (zone, seconds))
+
+    def test_matches_probing(self):
+        for zone in ZONES:
+            tzinfo = get_tzinfo(zone)
+            periods = list(_probed_periods(tzinfo, 1900, 2100))
+            table = get_table(zone)
+            self.assertEqual(len(table), len(periods), zone)
+            self.assertEqual(list(table.offsets), [offset for _, _, offset, _ in periods], zone)
+
+    def test_tzif(self):
+        periods, last, has_rule = _tzif_periods(_tzif_data('America/New_York'))
+        self.assertTrue(has_rule)
+        self.assertEqual(periods[0][2:], (-17762, False))
+        self.assertEqual(periods[-1][1], datetime.datetime.fromtimestamp(last, pytz.UTC))
+        self.assertFalse(_tzif_periods(_tzif_data('Asia/Calcutta'))[2])
+        self.assertIsNone(_tzif_data('../etc/passwd'))
+
+    def test_rules_after_2037(self):
+        table = get_table('America/New_York')
+        self.assertEqual(
+            table.localize(datetime.datetime(2090, 7, 1, 12, 0)),
+            datetime.datetime(2090, 7, 1, 16, 0, tzinfo=pytz.UTC))
+        self.assertEqual(
+            table.localize(datetime.datetime(2090, 12, 1, 12, 0)),
+            datetime.datetime(2090, 12, 1, 17, 0, tzinfo=pytz.UTC))
+
+    def test_same_etas(self):
+        schedule_data = {
+            'schedule_type': 'cron', 'timezone': 'America/New_York', 'cron': '30 2 * * *'}
+        from_date = datetime.datetime(2024, 3, 8, tzinfo=pytz.UTC)
+        etas = list(Scheduler().iter_etas(schedule_data=schedule_data, start=from_date, limit=5))
+        set_backend('pytz')
+        self.assertEqual(etas, list(Scheduler().iter_etas(schedule_data=schedule_data, start=from_date, limit=5)))
@@ -0,0 +1,377 @@
+"""
+Timezone transition tables
+
+Each zone is reduced once to a sorted array of UTC transition instants
+(epoch seconds) with the UTC offset and DST flag in force from each of them,
+so converting between UTC and wall clock time is a bisect plus an integer add.
+
+Zones are loaded through a backend, `pytz` (default) or the standard library
+`zoneinfo`, chosen with `set_backend` or the `SCHEDULER_TZ_BACKEND`
+environment variable. Neither is imported before the first zone is needed.
+"""
+
+import array
+import bisect
+import datetime
+import os
+import struct
+from .utils import EPOCH, UTC
+
+FIRST_YEAR = 1900
+LAST_YEAR = 2100
+BACKENDS = ('pytz', 'zoneinfo')
+# zones without readable transitions are probed every 4 days, real transitions
+# are at least ~7 days apart
+PROBE_STEP = 4 * 86400
+
+_MIN = -2 ** 62
+_DAY = 86400
+_NAIVE_EPOCH = EPOCH.replace(tzinfo=None)
+_tables = {}
+_backend = os.environ.get('SCHEDULER_TZ_BACKEND', None) or 'pytz'
+_timezone_set = None
+
+
+# `AmbiguousTimeError` & `NonExistentTimeError`, built on first use so pytz
+# isn't imported with the module
+_exceptions = {}
+
+
+def _exception(name):
+    """
+    Which returns the exception class `name`, a subclass of the pytz
+    exception of the same name when pytz is installed
+    """
+    exception = _exceptions.get(name, None)
+    if exception is None:
+        try:
+            from pytz import exceptions
+            bases = (getattr(exceptions, name),)
+        except ImportError:
+            bases = (ValueError,)
+        exception = _exceptions[name] = type(name, bases, {'__module__': __name__})
+    return exception
+
+
+def __getattr__(name):
+    if name in ('AmbiguousTimeError', 'NonExistentTimeError'):
+        return _exception(name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def _epoch_seconds(value):
+    return (value - EPOCH) // datetime.timedelta(seconds=1)
+
+
+def _year_start(year):
+    return _epoch_seconds(datetime.datetime(year, 1, 1, tzinfo=UTC))
+
+
+def _transition_periods(tzinfo):
+    """
+    (year, UTC datetime, offset seconds, dst) of the periods pytz stores
+    """
+    for when, info in zip(tzinfo._utc_transition_times, tzinfo._transition_info):
+        yield when.year, when.replace(tzinfo=UTC), int(info[0].total_seconds()), bool(info[1])
+
+
+def _tzif_data(key):
+    """
+    Which returns the bytes of the TZif file of `key` from the zoneinfo
+    search path or the `tzdata` package, None when there is none
+    """
+    import zoneinfo
+    parts = key.split('/')
+    if '..' in parts:
+        return None  # exit
+    for root in zoneinfo.TZPATH:
+        path = os.path.join(root, *parts)
+        if os.path.isfile(path):
+            with open(path, 'rb') as handle:
+                return handle.read()
+    try:
+        from importlib import resources
+        return resources.files('tzdata.zoneinfo').joinpath(*parts).read_bytes()
+    except (ImportError, OSError):
+        return None
+
+
+def _tzif_periods(data):
+    """
+    (year, UTC datetime, offset seconds, dst) of the transitions a TZif file
+    (RFC 8536) lists, and whether its footer has a DST rule for later years
+    """
+    header = struct.Struct('>4sc15x6l')
+    magic, version, utc_count, std_count, leap_count, count, type_count, char_count = header.unpack_from(data)
+    if magic != b'TZif':
+        raise ValueError("Invalid TZif data")
+    time_size = 4
+    position = header.size
+    if version >= b'2':
+        # the version 1 block is followed by a second header & 64 bit times
+        position += count * 5 + type_count * 6 + char_count + leap_count * 8 + std_count + utc_count
+        _, _, utc_count, std_count, leap_count, count, type_count, char_count = header.unpack_from(data, position)
+        position += header.size
+        time_size = 8
+    times = struct.unpack_from('>{}{}'.format(count, 'q' if time_size == 8 else 'l'), data, position)
+    position += count * time_size
+    indexes = struct.unpack_from('>{}B'.format(count), data, position)
+    position += count
+    types = [struct.unpack_from('>lBB', data, position + index * 6)[:2] for index in range(type_count)]
+    position += type_count * 6 + char_count + leap_count * (time_size + 4) + std_count + utc_count
+    footer = data[position:].strip(b'\n') if version >= b'2' else b''
+
+    # before the first transition zoneinfo uses the first standard time type
+    initial = next((info for info in types if not info[1]), types[0])
+    current = (initial[0], bool(initial[1]))
+    periods = [(1, None, current[0], current[1])]
+    for seconds, index in zip(times, indexes):
+        found = (types[index][0], bool(types[index][1]))
+        if found != current:
+            when = EPOCH + datetime.timedelta(seconds=seconds)
+            periods.append((when.year, when, found[0], found[1]))
+            current = found
+    last = times[-1] if times else None
+    return periods, last, b',' in footer
+
+
+def _zoneinfo_periods(tzinfo, first_year, last_year):
+    """
+    (year, UTC datetime, offset seconds, dst) of the periods of a zoneinfo zone,
+    read from its TZif file, the rule in force after the last listed
+    transition is probed
+    """
+    data = _tzif_data(tzinfo.key)
+    if data is None:
+        return list(_probed_periods(tzinfo, first_year, last_year))  # exit
+    periods, last, has_rule = _tzif_periods(data)
+    if has_rule:
+        start = _year_start(first_year) if last is None else max(last, _year_start(first_year))
+        periods.extend(_probed_changes(tzinfo, start, _year_start(last_year + 1)))
+    return periods
+
+
+def _probe(tzinfo, seconds):
+    value = datetime.datetime.fromtimestamp(seconds, tzinfo)
+    return int(value.utcoffset().total_seconds()), bool(value.dst())
+
+
+def _probed_changes(tzinfo, seconds, end):
+    """
+    (year, UTC datetime, offset seconds, dst) of the changes between `seconds`
+    and `end` (epoch seconds) found by probing `utcoffset` every `PROBE_STEP`
+    and bisecting each change to the second
+    """
+    current = _probe(tzinfo, seconds)
+    while seconds < end:
+        following = min(seconds + PROBE_STEP, end)
+        found = _probe(tzinfo, following)
+        if found != current:
+            low, high = seconds, following
+            while high - low > 1:
+                middle = (low + high) // 2
+                if _probe(tzinfo, middle) == current:
+                    low = middle
+                else:
+                    high = middle
+            when = EPOCH + datetime.timedelta(seconds=high)
+            yield when.year, when, found[0], found[1]
+            current = found
+        seconds = following
+
+
+def _probed_periods(tzinfo, first_year, last_year):
+    """
+    (year, UTC datetime, offset seconds, dst) of the periods found by probing
+    """
+    start = _year_start(first_year)
+    offset, dst = _probe(tzinfo, start)
+    yield first_year, None, offset, dst
+    for period in _probed_changes(tzinfo, start, _year_start(last_year + 1)):
+        yield period
+
+
+class TransitionTable(object):
+    """
+    UTC offsets of a timezone between `first_year` and `last_year`,
+    outside of the range the offset of the nearest period is used
+    """
+
+    __slots__ = ('name', 'times', 'offsets', 'dst', 'minute_times', 'minute_offsets')
+
+    def __init__(self, tzinfo, first_year=FIRST_YEAR, last_year=LAST_YEAR):
+        self.name = str(tzinfo)
+        if getattr(tzinfo, '_utc_transition_times', None):
+            periods = _transition_periods(tzinfo)
+        elif isinstance(tzinfo, datetime.timezone) or type(tzinfo).__module__.startswith('pytz'):
+            # fixed offset
+            offset = tzinfo.utcoffset(datetime.datetime(2000, 1, 1))
+            periods = [(first_year, None, int(offset.total_seconds()), False)]
+        elif getattr(tzinfo, 'key', None) and type(tzinfo).__module__.startswith('zoneinfo'):
+            periods = _zoneinfo_periods(tzinfo, first_year, last_year)
+        else:
+            periods = _probed_periods(tzinfo, first_year, last_year)
+
+        times = array.array('q')
+        offsets = array.array('q')
+        dst = array.array('b')
+        for year, when, offset, is_dst in periods:
+            if year > last_year:
+                break
+            if year < first_year:
+                # only the period in force at the start of the range is kept
+                del times[:], offsets[:], dst[:]
+            times.append(_MIN if not len(times) else _epoch_seconds(when))
+            offsets.append(offset)
+            dst.append(is_dst)
+        self.times = times
+        self.offsets = offsets
+        self.dst = dst
+        self.minute_times = array.array('q', (time // 60 for time in times))
+        self.minute_offsets = array.array('q', (offset // 60 for offset in offsets))
+
+    def __len__(self):
+        return len(self.times)
+
+    def lookup(self, minute):
+        """
+        Returns (offset in minutes, epoch minute of the next transition or None)
+        for the UTC epoch minute
+        """
+        times = self.minute_times
+        index = bisect.bisect_right(times, minute) - 1
+        if index < 0:
+            index = 0
+        if index + 1 < len(times):
+            return self.minute_offsets[index], times[index + 1]
+        return self.minute_offsets[index], None
+
+    def utcoffset(self, seconds):
+        """
+        UTC offset (seconds) in force at the UTC epoch second
+        """
+        index = bisect.bisect_right(self.times, seconds) - 1
+        return self.offsets[index if index > 0 else 0]
+
+    def to_local(self, value):
+        """
+        Aware datetime to naive wall clock datetime
+        """
+        seconds = _epoch_seconds(value)
+        return (EPOCH + datetime.timedelta(seconds=seconds + self.utcoffset(seconds))).replace(
+            tzinfo=None, microsecond=value.microsecond)
+
+    def to_utc_seconds(self, wall, is_dst=False):
+        """
+        Wall clock epoch seconds to UTC epoch seconds.
+        Ambiguous (repeated) times pick the period whose DST flag is `is_dst`
+        (the later one when undecided), nonexistent (skipped) times use the
+        offset before the gap when `is_dst` is False and after it when True,
+        `is_dst=None` raises `AmbiguousTimeError` / `NonExistentTimeError` instead.
+        """
+        times = self.times
+        offsets = self.offsets
+        # offsets stay within a day of UTC, only periods around that window can match
+        low = max(bisect.bisect_right(times, wall - _DAY) - 1, 0)
+        high = bisect.bisect_right(times, wall + _DAY)
+        candidates = []
+        for position in range(low, high):
+            utc = wall - offsets[position]
+            if times[position] <= utc and (position + 1 == len(times) or utc < times[position + 1]):
+                candidates.append(position)
+        if len(candidates) == 1:
+            return wall - offsets[candidates[0]]
+        if not candidates:
+            if is_dst is None:
+                raise _exception('NonExistentTimeError')(wall)
+            hint = wall + 6 * 3600 if is_dst else wall - 6 * 3600
+            return self.to_utc_seconds(hint, is_dst=is_dst) + (wall - hint)
+        if is_dst is None:
+            raise _exception('AmbiguousTimeError')(wall)
+        filtered = [position for position in candidates if bool(self.dst[position]) == is_dst]
+        if len(filtered) == 1:
+            return wall - offsets[filtered[0]]
+        instants = [wall - offsets[position] for position in (filtered or candidates)]
+        return min(instants) if is_dst else max(instants)
+
+    def localize(self, value, is_dst=False):
+        """
+        Naive wall clock datetime to aware UTC datetime
+        """
+        wall = (value.replace(microsecond=0) - _NAIVE_EPOCH) // datetime.timedelta(seconds=1)
+        seconds = self.to_utc_seconds(wall, is_dst=is_dst)
+        return EPOCH + datetime.timedelta(seconds=seconds, microseconds=value.microsecond)
+
+
+def get_backend():
+    return _backend
+
+
+def set_backend(backend):
+    """
+    Selects the backend ('pytz' or 'zoneinfo') zones are loaded with,
+    already built tables are dropped
+    """
+    global _backend
+    if backend not in BACKENDS:
+        raise ValueError("Invalid timezone backend {}, expecting one of {}".format(backend, ', '.join(BACKENDS)))
+    _backend = backend
+    _tables.clear()
+
+
+def get_tzinfo(name):
+    """
+    Which returns the tzinfo of a zone name from the current backend
+    """
+    if _backend == 'zoneinfo':
+        import zoneinfo
+        return zoneinfo.ZoneInfo(name)
+    if _backend != 'pytz':
+        raise ValueError("Invalid timezone backend {}, expecting one of {}".format(_backend, ', '.join(BACKENDS)))
+    import pytz
+    return pytz.timezone(name)
+
+
+def is_valid_timezone(name):
+    """
+    Whether the name is one of `TIMEZONES`, loaded on first use
+    """
+    global _timezone_set
+    if _timezone_set is None:
+        from .enums import TIMEZONE_SET
+        _timezone_set = TIMEZONE_SET
+    return name in _timezone_set
+
+
+def get_table(timezone):
+    """
+    Which returns the (cached) `TransitionTable` of a zone name or tzinfo
+    """
+    name = str(timezone)
+    table = _tables.get(name, None)
+    if table is None:
+        tzinfo = timezone if isinstance(timezone, datetime.tzinfo) else get_tzinfo(name)
+        table = _tables[name] = TransitionTable(tzinfo, FIRST_YEAR, LAST_YEAR)
+    return table
+
+
+def set_year_range(first_year, last_year):
+    """
+    Changes the year range of the tables, already built tables are dropped
+    """
+    global FIRST_YEAR, LAST_YEAR
+    if first_year > last_year:
+        raise ValueError("first_year should not be after last_year")
+    FIRST_YEAR, LAST_YEAR = first_year, last_year
+    _tables.clear()
+
+
+def build_tables(zones=None):
+    """
+    Precomputes the tables of the given zones (all of `TIMEZONES` by default)
+    """
+    if zones is None:
+        from .enums import TIMEZONES
+        zones = TIMEZONES
+    for zone in zones:
+        get_table(zone)
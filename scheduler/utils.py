@@ -0,0 +1,31 @@
+"""
+Datetime helpers
+"""
+
+import datetime
+
+UTC = datetime.timezone.utc
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def as_utc(value):
+    """
+    Naive datetimes are treated as UTC, aware ones are converted
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value.astimezone(UTC)
+
+
+def epoch_minutes(value):
+    """
+    Aware datetime to minutes since epoch (floored)
+    """
+    return int((value - EPOCH).total_seconds() // 60)
+
+
+def from_epoch_minutes(minutes):
+    """
+    Minutes since epoch to UTC datetime
+    """
+    return EPOCH + datetime.timedelta(minutes=minutes)